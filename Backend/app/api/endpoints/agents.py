@@ -76,8 +76,7 @@ def list_agents(
     Returns:
         Paginated list of agents with minimal data
     """
-    agents = agent_service.get_all_by_user_simple(db, current_user.id, skip, limit)
-    total = agent_service.count_by_user(db, current_user.id)
+    agents, total = agent_service.get_page_by_user_simple(db, current_user.id, skip, limit)
 
     return AgentSimpleList(
         items=agents,
@@ -4,22 +4,98 @@ Chat Endpoint
 Allows users to interact with their AI agents through a conversational interface.
 Handles the full loop: User message → LLM → Function calls → API execution → LLM → Response
 """
+import json
+import logging
 import time
 import uuid
-from typing import Dict, Any, List
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_active_user
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
+from app.models.agent import Agent
 from app.models.user import User
 from app.schemas.chat import ChatRequest, ChatResponse, FunctionCallDetail
 from app.services.agent_service import agent_service
 from app.services.llm_service import llm_service
 from app.services.api_executor import api_executor
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Upper bound on function calls per chat message (prevents infinite loops)
+MAX_FUNCTION_CALLS = 10
+
+
+async def _run_function_call(
+    db: Session,
+    agent: Agent,
+    function_call: Dict[str, Any]
+) -> Tuple[str, Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Execute a function call requested by the LLM (make the real API call).
+
+    Args:
+        db: Database session
+        agent: Agent instance
+        function_call: Function call from the LLM ({"name", "arguments"})
+
+    Returns:
+        Tuple of (result formatted for the LLM, function call details,
+        API call details or None if the call couldn't be executed)
+    """
+    function_name = function_call["name"]
+
+    # Parse arguments (they come as JSON string)
+    try:
+        arguments = json.loads(function_call["arguments"])
+    except json.JSONDecodeError:
+        arguments = {}
+        logger.warning("Failed to parse arguments of function call %r", function_name)
+
+    start_time = time.time()
+
+    try:
+        api_result = await api_executor.execute_function_call(
+            db=db,
+            agent=agent,
+            function_name=function_name,
+            arguments=arguments
+        )
+    except Exception as e:
+        logger.warning("Function call %r failed: %s", function_name, e)
+        return f"Error executing function: {str(e)}", {
+            "function_name": function_name,
+            "arguments": arguments,
+            "success": False,
+            "error": str(e)
+        }, None
+
+    execution_time = time.time() - start_time
+    logger.debug(
+        "Function call %r completed in %.2fs (success=%s, status=%s)",
+        function_name, execution_time, api_result.get("success"), api_result.get("status_code")
+    )
+
+    # Format result for LLM
+    result_str = api_executor.format_result_for_llm(api_result)
+
+    return result_str, {
+        "function_name": function_name,
+        "arguments": arguments,
+        "success": api_result.get("success", False),
+        "execution_time": execution_time
+    }, {
+        "method": api_result.get("method"),
+        "url": api_result.get("url"),
+        "status_code": api_result.get("status_code"),
+        "success": api_result.get("success", False)
+    }
+
 
 @router.post("/agents/{agent_id}/chat", response_model=ChatResponse)
 async def chat_with_agent(
@@ -96,7 +172,7 @@ async def chat_with_agent(
         assistant_message = llm_response["choices"][0]["message"]
 
         # Handle function calling loop
-        max_iterations = 10  # Prevent infinite loops
+        max_iterations = MAX_FUNCTION_CALLS
         iteration = 0
 
         while assistant_message.get("function_call") and iteration < max_iterations:
@@ -107,61 +183,10 @@ async def chat_with_agent(
             function_name = function_call["name"]
             print(f"[CHAT ENDPOINT] LLM wants to call function: {function_name}")
 
-            # Parse arguments (they come as JSON string)
-            import json
-            try:
-                arguments = json.loads(function_call["arguments"])
-                print(f"[CHAT ENDPOINT] Function arguments: {arguments}")
-            except json.JSONDecodeError:
-                arguments = {}
-                print(f"[CHAT ENDPOINT] WARNING: Failed to parse function arguments")
-
-            # Execute the function (make real API call)
-            start_time = time.time()
-            print(f"[CHAT ENDPOINT] Executing function via API executor...")
-
-            try:
-                api_result = await api_executor.execute_function_call(
-                    db=db,
-                    agent=agent,
-                    function_name=function_name,
-                    arguments=arguments
-                )
-
-                execution_time = time.time() - start_time
-                print(f"[CHAT ENDPOINT] Function execution completed in {execution_time:.2f}s")
-                print(f"[CHAT ENDPOINT] API call result: success={api_result.get('success')}, status={api_result.get('status_code')}")
-
-                # Track the function call
-                function_calls_made.append({
-                    "function_name": function_name,
-                    "arguments": arguments,
-                    "success": api_result.get("success", False),
-                    "execution_time": execution_time
-                })
-
-                # Track the API call details
-                api_calls_made.append({
-                    "method": api_result.get("method"),
-                    "url": api_result.get("url"),
-                    "status_code": api_result.get("status_code"),
-                    "success": api_result.get("success", False)
-                })
-
-                # Format result for LLM
-                result_str = api_executor.format_result_for_llm(api_result)
-
-                print(f"[CHAT ENDPOINT] Formatted result for LLM (first 200 chars): {result_str[:200]}...")
-                
-            except Exception as e:
-                print(f"[CHAT ENDPOINT] ERROR during function execution: {str(e)}")
-                result_str = f"Error executing function: {str(e)}"
-                function_calls_made.append({
-                    "function_name": function_name,
-                    "arguments": arguments,
-                    "success": False,
-                    "error": str(e)
-                })
+            result_str, call_record, api_record = await _run_function_call(db, agent, function_call)
+            function_calls_made.append(call_record)
+            if api_record is not None:
+                api_calls_made.append(api_record)
 
             # Add function call and result to messages
             messages.append({
@@ -219,6 +244,126 @@ async def chat_with_agent(
         )
 
 
+def _sse_event(data: Dict[str, Any]) -> bytes:
+    """Encode a server-sent event carrying a JSON payload."""
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+@router.post("/agents/{agent_id}/chat/stream")
+async def chat_with_agent_stream(
+    agent_id: int,
+    chat_request: ChatRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Chat with an AI agent, streaming the reply as server-sent events.
+
+    Each event is a JSON object with a "type":
+    - "content": piece of the reply text ("content")
+    - "function_call": API call made by the agent, once executed
+      (same details as ChatResponse.function_calls, plus "api_call")
+    - "done": end of the reply ("conversation_id")
+    - "error": the chat failed ("detail")
+
+    Args:
+        agent_id: Agent ID
+        chat_request: Chat request with user message
+        current_user: Current authenticated user
+        db: Database session
+
+    Returns:
+        text/event-stream response
+
+    Raises:
+        HTTPException: If agent not found or not active
+    """
+    agent = agent_service.get_by_id(db, agent_id, current_user.id)
+    if not agent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+
+    if not agent.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Agent is not active"
+        )
+
+    conversation_id = chat_request.conversation_id or str(uuid.uuid4())
+    messages = [
+        {"role": "system", "content": agent.system_prompt},
+        {"role": "user", "content": chat_request.message}
+    ]
+
+    async def events() -> AsyncIterator[bytes]:
+        # The body is streamed after the handler returns, when the request's
+        # session may already be closed: function calls use their own
+        with SessionLocal() as db:
+            has_content = False
+            try:
+                for iteration in range(MAX_FUNCTION_CALLS + 1):
+                    # Forward text as it arrives; function call deltas (name,
+                    # then argument fragments) are assembled until the turn ends
+                    function_call = None
+                    async for chunk in llm_service.chat_completion_stream(
+                        user=current_user,
+                        agent=agent,
+                        messages=messages,
+                        functions=agent.available_functions
+                    ):
+                        choices = chunk.get("choices")
+                        if not choices:
+                            continue
+                        delta = choices[0].get("delta") or {}
+                        if delta.get("content"):
+                            has_content = True
+                            yield _sse_event({"type": "content", "content": delta["content"]})
+                        call_delta = delta.get("function_call")
+                        if call_delta:
+                            if function_call is None:
+                                function_call = {"name": "", "arguments": ""}
+                            function_call["name"] += call_delta.get("name") or ""
+                            function_call["arguments"] += call_delta.get("arguments") or ""
+
+                    if function_call is None or iteration == MAX_FUNCTION_CALLS:
+                        break
+
+                    result_str, call_record, api_record = await _run_function_call(db, agent, function_call)
+                    yield _sse_event({"type": "function_call", **call_record, "api_call": api_record})
+
+                    messages.append({
+                        "role": "assistant",
+                        "content": None,
+                        "function_call": function_call
+                    })
+                    messages.append({
+                        "role": "function",
+                        "name": function_call["name"],
+                        "content": result_str
+                    })
+
+                if not has_content:
+                    yield _sse_event({
+                        "type": "content",
+                        "content": "I completed the action but couldn't generate a response."
+                    })
+                yield _sse_event({"type": "done", "conversation_id": conversation_id})
+
+            except ValueError as e:
+                # LLM API key error or similar
+                yield _sse_event({"type": "error", "detail": str(e)})
+            except Exception as e:
+                yield _sse_event({"type": "error", "detail": f"Chat error: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/agents/{agent_id}/test-function")
 async def test_function_execution(
     agent_id: int,
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Response
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_active_user
@@ -141,8 +141,7 @@ def list_swagger_docs(
     Returns:
         Paginated list of Swagger docs
     """
-    docs = swagger_doc_service.get_all_by_user(db, current_user.id, skip, limit)
-    total = swagger_doc_service.count_by_user(db, current_user.id)
+    docs, total = swagger_doc_service.get_page_by_user(db, current_user.id, skip, limit)
     
     return SwaggerDocList(
         items=docs,
@@ -237,11 +236,15 @@ def get_swagger_endpoints(
             detail="Swagger document not found"
         )
     
-    return EndpointList(
+    # Validated (and coerced, e.g. deprecated to bool) by EndpointList,
+    # then serialized with orjson; FastAPI doesn't re-validate a Response
+    endpoint_list = EndpointList(
         items=endpoints,
         total=len(endpoints),
         swagger_doc_id=doc_id
     )
+    content = swagger_parser.serialize_endpoints(endpoint_list.model_dump())
+    return Response(content=content, media_type="application/json")
 
 
 @router.put("/{doc_id}", response_model=SwaggerDoc)
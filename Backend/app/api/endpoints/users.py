@@ -6,6 +6,7 @@ from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import User as UserSchema, UserUpdate, UserWithKeys, UserLLMKeysUpdate
 from app.services.user_service import user_service
+from app.services.llm_service import llm_service
 from app.core.encryption import encrypt_api_key, decrypt_api_key, mask_api_key
 
 router = APIRouter()
@@ -99,6 +100,7 @@ def update_llm_keys(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    llm_service.invalidate_api_keys(current_user.id)
     
     # Return with flags
     user_dict = {
@@ -139,6 +141,7 @@ def delete_llm_key(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    llm_service.invalidate_api_keys(current_user.id)
     
     user_dict = {
         **current_user.__dict__,
@@ -44,6 +44,13 @@ class Settings(BaseSettings):
     # LLM Configuration
     OPENAI_API_KEY: Optional[str] = None
     LLM_PROVIDER: str = "openai"
+    OPENAI_MAX_CONCURRENCY: int = 16
+    ANTHROPIC_MAX_CONCURRENCY: int = 16
+    OLLAMA_MAX_CONCURRENCY: int = 2
+    LLM_MAX_ATTEMPTS: int = 3
+    
+    # Swagger parsing
+    PARSER_WORKERS: int = 4
     
     # Server
     HOST: str = "0.0.0.0"
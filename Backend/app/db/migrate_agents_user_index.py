@@ -0,0 +1,32 @@
+"""
+Migration script to add a composite (user_id, id) index on the agents table.
+Run this to speed up per-user agent listings and counts on existing databases.
+"""
+from sqlalchemy import text
+from app.db.session import engine
+
+
+def migrate_agents_index():
+    """Create composite index on agents(user_id, id)."""
+    print("🔄 Creating agents (user_id, id) index...")
+
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_agents_user_id_id
+                ON agents(user_id, id)
+            """))
+            print("  ✅ Created index ix_agents_user_id_id")
+
+            conn.commit()
+
+        except Exception as e:
+            print(f"  ⚠️  Error during migration: {e}")
+            conn.rollback()
+            raise
+
+    print("\n✅ Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate_agents_index()
@@ -0,0 +1,50 @@
+"""
+Migration script to add function_name column to endpoints table.
+Run this to add the column and backfill existing endpoints without dropping data.
+"""
+from sqlalchemy import text
+from app.db.session import engine
+from app.services.agent_generator import build_function_name
+
+
+def migrate_endpoints_table():
+    """Add function_name column to endpoints table and backfill it."""
+    print("🔄 Migrating endpoints table...")
+
+    with engine.connect() as conn:
+        try:
+            conn.execute(text(
+                "ALTER TABLE endpoints ADD COLUMN function_name VARCHAR(255)"
+            ))
+            print("  ✅ Added function_name column")
+        except Exception as e:
+            if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
+                print("  ℹ️  function_name column already exists")
+                conn.rollback()
+            else:
+                print(f"  ⚠️  Error adding function_name: {e}")
+                conn.rollback()
+                raise
+
+        # Backfill function names for endpoints imported before the column existed
+        rows = conn.execute(text(
+            "SELECT id, method, path, operation_id FROM endpoints WHERE function_name IS NULL"
+        )).fetchall()
+
+        for row in rows:
+            conn.execute(
+                text("UPDATE endpoints SET function_name = :function_name WHERE id = :id"),
+                {
+                    "function_name": build_function_name(row.method, row.path, row.operation_id),
+                    "id": row.id
+                }
+            )
+        print(f"  ✅ Backfilled function_name for {len(rows)} endpoints")
+
+        conn.commit()
+
+    print("\n✅ Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate_endpoints_table()
@@ -0,0 +1,52 @@
+"""
+Migration script to add content_hash column to swagger_docs table.
+Run this to add the column and backfill existing documents without dropping data.
+"""
+from sqlalchemy import text
+from app.db.session import SessionLocal, engine
+from app.models.swagger_doc import SwaggerDoc
+from app.services.swagger_parser import swagger_parser
+
+
+def migrate_swagger_docs_table():
+    """Add content_hash column to swagger_docs table and backfill it."""
+    print("🔄 Migrating swagger_docs table...")
+
+    with engine.connect() as conn:
+        try:
+            conn.execute(text(
+                "ALTER TABLE swagger_docs ADD COLUMN content_hash VARCHAR(32)"
+            ))
+            print("  ✅ Added content_hash column")
+        except Exception as e:
+            if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
+                print("  ℹ️  content_hash column already exists")
+                conn.rollback()
+            else:
+                print(f"  ⚠️  Error adding content_hash: {e}")
+                conn.rollback()
+                raise
+
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_swagger_docs_content_hash ON swagger_docs(content_hash)"
+        ))
+        print("  ✅ Created index on content_hash")
+
+        conn.commit()
+
+    # Backfill hashes for documents uploaded before the column existed
+    db = SessionLocal()
+    try:
+        docs = db.query(SwaggerDoc).filter(SwaggerDoc.content_hash.is_(None)).all()
+        for doc in docs:
+            doc.content_hash = swagger_parser.compute_content_hash(doc.spec)
+        db.commit()
+        print(f"  ✅ Backfilled content_hash for {len(docs)} documents")
+    finally:
+        db.close()
+
+    print("\n✅ Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate_swagger_docs_table()
@@ -1,13 +1,19 @@
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    # Use orjson for JSON columns (spec, available_functions, ...).
+    # YAML specs can carry int keys (e.g. response codes), which stdlib
+    # json silently stringifies, so keep that behaviour.
+    json_serializer=lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode(),
+    json_deserializer=orjson.loads
 )
 
 # Create session factory
@@ -26,4 +32,23 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def commit_without_expire(db: Session) -> None:
+    """
+    Commit without expiring the session's instances.
+    
+    Only for commits whose written values are all known to the ORM
+    (Python-side defaults, generated primary keys, explicit values), so
+    the instances can be used afterwards without a refresh SELECT.
+    
+    Args:
+        db: Database session
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
@@ -1,7 +1,12 @@
+import logging
+import logging.handlers
+import queue
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.api import api_router
 from app.core.config import settings
+from app.services.api_executor import api_executor
+from app.services.llm_service import llm_service
 
 # Create FastAPI application
 app = FastAPI(
@@ -25,6 +30,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Route log records through a queue so handler I/O runs on a background
+# thread instead of blocking the event loop
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, logging.StreamHandler(), respect_handler_level=True
+)
+logging.basicConfig(
+    level=logging.DEBUG if settings.DEBUG else logging.INFO,
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
@@ -39,6 +55,20 @@ def root():
     }
 
 
+@app.on_event("startup")
+async def startup():
+    """Start the background log listener."""
+    _log_listener.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close shared HTTP clients and flush pending log records."""
+    await api_executor.aclose()
+    await llm_service.aclose()
+    _log_listener.stop()
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, Integer, String, Text, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, DateTime, Integer, String, Text, ForeignKey, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -8,6 +8,10 @@ class Agent(Base):
     """Model for storing AI agents that can use APIs."""
     
     __tablename__ = "agents"
+    __table_args__ = (
+        # Covers per-user listing (filter on user_id, order by id) and counts
+        Index("ix_agents_user_id_id", "user_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -20,6 +20,7 @@ class Endpoint(Base):
     summary = Column(String(500), nullable=True)
     description = Column(Text, nullable=True)
     operation_id = Column(String(255), nullable=True, index=True)  # Unique operation identifier
+    function_name = Column(String(255), nullable=True)  # LLM function name, computed at import
     
     # Tags for categorization
     tags = Column(JSON, nullable=True)  # List of tags
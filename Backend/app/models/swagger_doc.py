@@ -22,6 +22,7 @@ class SwaggerDoc(Base):
     
     # Complete specification
     spec = Column(JSON, nullable=False)  # Full Swagger/OpenAPI spec as JSON
+    content_hash = Column(String(32), nullable=True, index=True)  # BLAKE2b digest of the spec
     
     # Parsed data
     endpoints_count = Column(Integer, default=0)
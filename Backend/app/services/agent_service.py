@@ -3,21 +3,98 @@ Agent Service
 
 This service handles CRUD operations for AI agents.
 """
-from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
-
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+import threading
+import orjson
+from cachetools import LRUCache
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.db.session import commit_without_expire
 from app.models.agent import Agent
 from app.models.swagger_doc import SwaggerDoc
 from app.models.endpoint import Endpoint
 from app.models.endpoint_customization import EndpointCustomization
 from app.schemas.agent import AgentCreate, AgentUpdate, AgentSimple
-from app.services.agent_generator import agent_generator
+from app.services.agent_generator import generate_system_prompt, generate_function_definitions
+from app.services.api_executor import invalidate_functions_index
 from app.services.swagger_doc_service import swagger_doc_service
 
 
+# Generated (system_prompt, JSON-encoded functions) per swagger doc
+# content and endpoint customizations; generation is deterministic for a
+# given key. Functions are kept encoded so agents never share (and
+# mutate) the same list. Sync endpoints run in the threadpool, so
+# accesses take the lock.
+_GENERATION_CACHE: LRUCache = LRUCache(maxsize=256)
+_GENERATION_CACHE_LOCK = threading.Lock()
+
+
 class AgentService:
     """Service for managing AI agents."""
 
+    @staticmethod
+    def _generation_cache_key(
+        swagger_doc_id: int,
+        content_hash: Optional[str],
+        updated_at: Any,
+        customizations_map: Dict[str, EndpointCustomization]
+    ) -> Tuple[Any, ...]:
+        """
+        Build the cache key for generated prompts and functions.
+
+        Function metadata references endpoint IDs, so the key is scoped to
+        the swagger doc; updated_at covers metadata edits (name, base URL...).
+
+        Args:
+            swagger_doc_id: Swagger document ID
+            content_hash: Swagger document content hash
+            updated_at: Swagger document last update time
+            customizations_map: Dict mapping operation_id to EndpointCustomization
+
+        Returns:
+            Hashable cache key
+        """
+        customizations = tuple(sorted(
+            (operation_id, bool(c.is_enabled), c.custom_description or "")
+            for operation_id, c in customizations_map.items()
+        ))
+        return (swagger_doc_id, content_hash, updated_at, customizations)
+
+    @staticmethod
+    def _get_generation(key: Tuple[Any, ...]) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Get generated prompt and functions from the cache.
+
+        Args:
+            key: Cache key from _generation_cache_key
+
+        Returns:
+            Tuple of (system_prompt, functions) or None; the functions
+            are a new copy for the caller
+        """
+        with _GENERATION_CACHE_LOCK:
+            cached = _GENERATION_CACHE.get(key)
+        if cached is None:
+            return None
+        system_prompt, functions_json = cached
+        return system_prompt, orjson.loads(functions_json)
+
+    @staticmethod
+    def _store_generation(key: Tuple[Any, ...], system_prompt: str, functions: List[Dict[str, Any]]) -> None:
+        """
+        Store generated prompt and functions in the cache.
+
+        Args:
+            key: Cache key from _generation_cache_key
+            system_prompt: Generated system prompt
+            functions: Generated function definitions
+        """
+        functions_json = orjson.dumps(functions)
+        with _GENERATION_CACHE_LOCK:
+            _GENERATION_CACHE[key] = (system_prompt, functions_json)
+
     @staticmethod
     def _get_customizations_map(db: Session, swagger_doc_id: int) -> Dict[str, EndpointCustomization]:
         """
@@ -37,33 +114,29 @@ class AgentService:
         return {c.operation_id: c for c in customizations}
 
     @staticmethod
-    def _filter_enabled_endpoints(db: Session, swagger_doc_id: int, endpoints: List[Endpoint]) -> List[Endpoint]:
+    def _filter_enabled_endpoints(
+        endpoints: List[Endpoint],
+        customizations_map: Dict[str, EndpointCustomization]
+    ) -> List[Endpoint]:
         """
         Filter endpoints based on endpoint customizations.
         Only return endpoints that are enabled (is_enabled=True or no customization).
 
         Args:
-            db: Database session
-            swagger_doc_id: Swagger document ID
             endpoints: List of all endpoints
+            customizations_map: Dict mapping operation_id to EndpointCustomization
 
         Returns:
             List of enabled endpoints only
         """
-        # Get customizations map
-        customization_map = AgentService._get_customizations_map(db, swagger_doc_id)
-
-        # Filter endpoints
-        enabled_endpoints = []
-        for endpoint in endpoints:
-            # If there's a customization, check if it's enabled
-            # If no customization, endpoint is enabled by default
-            customization = customization_map.get(endpoint.operation_id)
-            is_enabled = customization.is_enabled if customization else True
-            if is_enabled:
-                enabled_endpoints.append(endpoint)
+        # Endpoints without a customization are enabled by default,
+        # so only the explicitly disabled operation_ids need to be excluded
+        disabled = {
+            operation_id for operation_id, c in customizations_map.items()
+            if not c.is_enabled
+        }
 
-        return enabled_endpoints
+        return [e for e in endpoints if e.operation_id not in disabled]
 
     @staticmethod
     def get_by_id(db: Session, agent_id: int, user_id: int) -> Optional[Agent]:
@@ -138,6 +211,33 @@ class AgentService:
         Returns:
             List of AgentSimple with minimal data
         """
+        agents, _ = AgentService.get_page_by_user_simple(db, user_id, skip, limit)
+        return agents
+
+    @staticmethod
+    def get_page_by_user_simple(
+        db: Session,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[AgentSimple], int]:
+        """
+        Get a page of agents for a user along with the total agent count.
+
+        The total is computed with a COUNT(*) OVER () window in the same
+        query, so paginated listings need a single round-trip. Functions
+        are counted by the database, so the large available_functions
+        column is never loaded.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+
+        Returns:
+            Tuple of (list of AgentSimple, total count of user's agents)
+        """
         # Query with join to get swagger_doc_name
         agents = db.query(
             Agent.id,
@@ -148,13 +248,14 @@ class AgentService:
             Agent.is_active,
             Agent.swagger_doc_id,
             Agent.created_at,
-            Agent.available_functions,
-            SwaggerDoc.name.label('swagger_doc_name')
+            func.coalesce(func.json_array_length(Agent.available_functions), 0).label('functions_count'),
+            SwaggerDoc.name.label('swagger_doc_name'),
+            func.count().over().label('total')
         ).join(
             SwaggerDoc, Agent.swagger_doc_id == SwaggerDoc.id
         ).filter(
             Agent.user_id == user_id
-        ).offset(skip).limit(limit).all()
+        ).order_by(Agent.id).offset(skip).limit(limit).all()
 
         # Convert to AgentSimple schema
         result = []
@@ -169,10 +270,13 @@ class AgentService:
                 swagger_doc_id=agent.swagger_doc_id,
                 swagger_doc_name=agent.swagger_doc_name,
                 created_at=agent.created_at,
-                functions_count=len(agent.available_functions) if agent.available_functions else 0
+                functions_count=agent.functions_count
             ))
 
-        return result
+        # An empty page (skip past the end) carries no window total
+        total = agents[0].total if agents else AgentService.count_by_user(db, user_id)
+
+        return result, total
 
     @staticmethod
     def count_by_user(db: Session, user_id: int) -> int:
@@ -186,9 +290,9 @@ class AgentService:
         Returns:
             Count of agents
         """
-        return db.query(Agent).filter(
-            Agent.user_id == user_id
-        ).count()
+        return db.scalar(
+            select(func.count(Agent.id)).where(Agent.user_id == user_id)
+        ) or 0
     
     @staticmethod
     def create(
@@ -209,28 +313,28 @@ class AgentService:
         """
         errors = []
         
-        # Get Swagger doc
-        swagger_doc = swagger_doc_service.get_by_id(
-            db,
-            agent_in.swagger_doc_id,
-            user_id
-        )
+        # Check ownership with a narrow projection; the full doc (with its
+        # spec) is only loaded when the generated output isn't cached
+        doc_state = db.query(
+            SwaggerDoc.content_hash,
+            SwaggerDoc.updated_at
+        ).filter(
+            SwaggerDoc.id == agent_in.swagger_doc_id,
+            SwaggerDoc.user_id == user_id
+        ).first()
         
-        if not swagger_doc:
+        if not doc_state:
             return {
                 "success": False,
                 "message": "Swagger document not found or unauthorized",
                 "errors": ["Swagger document not found"]
             }
         
-        # Get endpoints
-        endpoints = swagger_doc_service.get_endpoints(
-            db,
-            agent_in.swagger_doc_id,
-            user_id
-        )
+        has_endpoints = db.query(Endpoint.id).filter(
+            Endpoint.swagger_doc_id == agent_in.swagger_doc_id
+        ).first()
 
-        if not endpoints:
+        if not has_endpoints:
             return {
                 "success": False,
                 "message": "No endpoints found in Swagger document",
@@ -240,33 +344,50 @@ class AgentService:
         # Get customizations for custom descriptions
         customizations_map = AgentService._get_customizations_map(db, agent_in.swagger_doc_id)
 
-        # Filter only enabled endpoints
-        enabled_endpoints = AgentService._filter_enabled_endpoints(
-            db,
+        cache_key = AgentService._generation_cache_key(
             agent_in.swagger_doc_id,
-            endpoints
+            doc_state.content_hash,
+            doc_state.updated_at,
+            customizations_map
         )
-
-        if not enabled_endpoints:
-            return {
-                "success": False,
-                "message": "No enabled endpoints found in Swagger document",
-                "errors": ["All endpoints are disabled"]
-            }
-
-        # Generate system prompt
-        try:
-            system_prompt = agent_generator.generate_system_prompt(swagger_doc, enabled_endpoints)
-        except Exception as e:
-            errors.append(f"Failed to generate system prompt: {str(e)}")
-            system_prompt = f"You are an AI assistant for the {swagger_doc.name} API."
-
-        # Generate function definitions with custom descriptions
-        try:
-            functions = agent_generator.generate_function_definitions(enabled_endpoints, customizations_map)
-        except Exception as e:
-            errors.append(f"Failed to generate functions: {str(e)}")
-            functions = []
+        cached = AgentService._get_generation(cache_key)
+
+        if cached:
+            system_prompt, functions = cached
+        else:
+            swagger_doc = swagger_doc_service.get_by_id(db, agent_in.swagger_doc_id, user_id)
+
+            # Ownership is already checked
+            endpoints = db.query(Endpoint).filter(
+                Endpoint.swagger_doc_id == agent_in.swagger_doc_id
+            ).all()
+
+            # Filter only enabled endpoints
+            enabled_endpoints = AgentService._filter_enabled_endpoints(endpoints, customizations_map)
+
+            if not enabled_endpoints:
+                return {
+                    "success": False,
+                    "message": "No enabled endpoints found in Swagger document",
+                    "errors": ["All endpoints are disabled"]
+                }
+
+            # Generate system prompt
+            try:
+                system_prompt = generate_system_prompt(swagger_doc, enabled_endpoints)
+            except Exception as e:
+                errors.append(f"Failed to generate system prompt: {str(e)}")
+                system_prompt = f"You are an AI assistant for the {swagger_doc.name} API."
+
+            # Generate function definitions with custom descriptions
+            try:
+                functions = generate_function_definitions(enabled_endpoints, customizations_map)
+            except Exception as e:
+                errors.append(f"Failed to generate functions: {str(e)}")
+                functions = []
+
+            if not errors:
+                AgentService._store_generation(cache_key, system_prompt, functions)
         
         # Create agent
         agent = Agent(
@@ -283,9 +404,10 @@ class AgentService:
             is_active=True
         )
         
+        # The commit flushes the insert and sets the generated ID; the
+        # other columns are already known, so nothing needs reloading
         db.add(agent)
-        db.commit()
-        db.refresh(agent)
+        commit_without_expire(db)
         
         return {
             "success": True,
@@ -313,13 +435,25 @@ class AgentService:
             Updated Agent
         """
         update_data = agent_update.model_dump(exclude_unset=True)
-        
-        for field, value in update_data.items():
-            setattr(agent, field, value)
-        
-        db.add(agent)
-        db.commit()
-        db.refresh(agent)
+
+        # Only write fields whose value actually changes, with a targeted
+        # UPDATE; unchanged payloads issue no SQL at all
+        changes = {
+            field: value for field, value in update_data.items()
+            if getattr(agent, field) != value
+        }
+
+        if changes:
+            # Set updated_at explicitly so the in-session agent is synchronized
+            # with it as well and doesn't need a refresh
+            db.execute(
+                update(Agent).where(Agent.id == agent.id).values(
+                    **changes,
+                    updated_at=datetime.utcnow()
+                )
+            )
+            commit_without_expire(db)
+            invalidate_functions_index(agent)
         return agent
     
     @staticmethod
@@ -351,8 +485,10 @@ class AgentService:
         """
         errors = []
         
-        # Get Swagger doc
-        swagger_doc = db.query(SwaggerDoc).filter(
+        # Get Swagger doc with its endpoints eagerly loaded
+        swagger_doc = db.query(SwaggerDoc).options(
+            selectinload(SwaggerDoc.endpoints)
+        ).filter(
             SwaggerDoc.id == agent.swagger_doc_id
         ).first()
         
@@ -364,9 +500,7 @@ class AgentService:
             }
         
         # Get endpoints
-        endpoints = db.query(Endpoint).filter(
-            Endpoint.swagger_doc_id == agent.swagger_doc_id
-        ).all()
+        endpoints = swagger_doc.endpoints
 
         if not endpoints:
             return {
@@ -379,11 +513,7 @@ class AgentService:
         customizations_map = AgentService._get_customizations_map(db, agent.swagger_doc_id)
 
         # Filter only enabled endpoints
-        enabled_endpoints = AgentService._filter_enabled_endpoints(
-            db,
-            agent.swagger_doc_id,
-            endpoints
-        )
+        enabled_endpoints = AgentService._filter_enabled_endpoints(endpoints, customizations_map)
 
         if not enabled_endpoints:
             return {
@@ -393,19 +523,34 @@ class AgentService:
             }
 
         # Regenerate with custom descriptions
-        try:
-            agent.system_prompt = agent_generator.generate_system_prompt(swagger_doc, enabled_endpoints)
-            agent.available_functions = agent_generator.generate_function_definitions(enabled_endpoints, customizations_map)
-        except Exception as e:
-            return {
-                "success": False,
-                "message": f"Failed to regenerate: {str(e)}",
-                "errors": [str(e)]
-            }
+        cache_key = AgentService._generation_cache_key(
+            swagger_doc.id,
+            swagger_doc.content_hash,
+            swagger_doc.updated_at,
+            customizations_map
+        )
+        cached = AgentService._get_generation(cache_key)
+
+        if cached:
+            system_prompt, functions = cached
+        else:
+            try:
+                system_prompt = generate_system_prompt(swagger_doc, enabled_endpoints)
+                functions = generate_function_definitions(enabled_endpoints, customizations_map)
+            except Exception as e:
+                return {
+                    "success": False,
+                    "message": f"Failed to regenerate: {str(e)}",
+                    "errors": [str(e)]
+                }
+            AgentService._store_generation(cache_key, system_prompt, functions)
+
+        agent.system_prompt = system_prompt
+        agent.available_functions = functions
+        invalidate_functions_index(agent)
         
         db.add(agent)
-        db.commit()
-        db.refresh(agent)
+        commit_without_expire(db)
         
         return {
             "success": True,
@@ -5,18 +5,215 @@ This service executes real HTTP calls to external APIs based on function calls
 from the LLM. It interprets the agent's function metadata and makes the actual
 requests to the endpoints defined in the Swagger documentation.
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from functools import lru_cache
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 import httpx
-import json
+import logging
+import orjson
+from cachetools import LRUCache, TTLCache
+import re
+import threading
 from urllib.parse import urljoin
+from app.core.config import settings
 from app.models.agent import Agent
 from app.models.endpoint import Endpoint
 from app.models.swagger_doc import SwaggerDoc
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, raiseload
+
+logger = logging.getLogger(__name__)
+
+_ALLOWED_METHODS = frozenset(("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"))
+_BODY_METHODS = frozenset(("POST", "PUT", "PATCH"))
+
+# Per-endpoint (path, query, header) parameter names, keyed by
+# (endpoint id, created_at). Endpoint rows are immutable once imported.
+_PARAMETER_NAMES_CACHE: LRUCache = LRUCache(maxsize=1024)
+_PARAMETER_NAMES_CACHE_LOCK = threading.Lock()
+
+
+def _parameter_names(endpoint: Endpoint) -> Tuple[Tuple[str, ...], ...]:
+    """
+    Get the names of an endpoint's path, query and header parameters.
+
+    Args:
+        endpoint: Endpoint instance
+
+    Returns:
+        Tuple of (path_names, query_names, header_names)
+    """
+    key = (endpoint.id, endpoint.created_at)
+    with _PARAMETER_NAMES_CACHE_LOCK:
+        names = _PARAMETER_NAMES_CACHE.get(key)
+    if names is None:
+        parameters = endpoint.parameters or {}
+        names = tuple(
+            tuple(p["name"] for p in parameters.get(location) or () if p.get("name"))
+            for location in ("path", "query", "header")
+        )
+        with _PARAMETER_NAMES_CACHE_LOCK:
+            _PARAMETER_NAMES_CACHE[key] = names
+    return names
+
+
+# Upper bound on API response bodies forwarded to the LLM
+_MAX_RESPONSE_SIZE = 10 * 1024 * 1024
+
+
+async def _reject_oversized_response(response: httpx.Response) -> None:
+    """
+    Reject responses whose declared size exceeds _MAX_RESPONSE_SIZE.
+
+    Runs as an httpx response hook, before the body is downloaded.
+
+    Args:
+        response: Response with headers received
+
+    Raises:
+        ValueError: If Content-Length is above the limit
+    """
+    content_length = response.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > _MAX_RESPONSE_SIZE:
+        raise ValueError(
+            f"Response too large ({content_length} bytes, limit is {_MAX_RESPONSE_SIZE})"
+        )
+
+
+class _RejectCookiesPolicy(DefaultCookiePolicy):
+    """Cookie policy that never stores nor sends cookies."""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+async def _read_capped(response: httpx.Response) -> bytes:
+    """
+    Read a streamed response body, up to _MAX_RESPONSE_SIZE bytes.
+
+    Bodies without (or with a wrong) Content-Length are cut off as soon
+    as they exceed the limit instead of being downloaded in full.
+
+    Args:
+        response: Streamed response
+
+    Returns:
+        Response body
+
+    Raises:
+        ValueError: If the body is above the limit
+    """
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > _MAX_RESPONSE_SIZE:
+            raise ValueError(f"Response too large (over {_MAX_RESPONSE_SIZE} bytes)")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+_PATH_PARAM_RE = re.compile(r"\{([^}]+)\}")
+
+
+@lru_cache(maxsize=1024)
+def _compile_path(path: str) -> Tuple[str, ...]:
+    """
+    Split a path template into literal and parameter tokens.
+
+    Args:
+        path: Path template (e.g. "/users/{id}/pets")
+
+    Returns:
+        Tokens alternating literals (even indexes) and parameter names (odd indexes)
+    """
+    return tuple(_PATH_PARAM_RE.split(path))
+
+
+# {name: function} indexes of agents, keyed by (agent id, updated_at)
+_FUNCTIONS_INDEX_CACHE: TTLCache = TTLCache(maxsize=512, ttl=300)
+_FUNCTIONS_INDEX_CACHE_LOCK = threading.Lock()
+
+
+def _functions_index(agent: Agent) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the agent's available functions indexed by name.
+
+    The index is kept on the agent instance and in a process-wide TTL
+    cache keyed by (agent id, updated_at), so repeated function calls
+    don't scan the whole list, even across requests.
+
+    Args:
+        agent: Agent instance
+
+    Returns:
+        Dict mapping function name to function definition
+    """
+    index = agent.__dict__.get("_functions_by_name")
+    if index is None:
+        key = (agent.id, agent.updated_at)
+        with _FUNCTIONS_INDEX_CACHE_LOCK:
+            index = _FUNCTIONS_INDEX_CACHE.get(key)
+        if index is None:
+            index = {f["name"]: f for f in agent.available_functions or []}
+            with _FUNCTIONS_INDEX_CACHE_LOCK:
+                _FUNCTIONS_INDEX_CACHE[key] = index
+        agent.__dict__["_functions_by_name"] = index
+    return index
+
+
+def invalidate_functions_index(agent: Agent) -> None:
+    """
+    Drop the cached functions index of an agent.
+
+    Must be called whenever agent.available_functions is reassigned.
+
+    Args:
+        agent: Agent instance
+    """
+    agent.__dict__.pop("_functions_by_name", None)
+    with _FUNCTIONS_INDEX_CACHE_LOCK:
+        _FUNCTIONS_INDEX_CACHE.pop((agent.id, agent.updated_at), None)
 
 
 class APIExecutorService:
     """Service for executing API calls based on agent function calls."""
+
+    # Shared HTTP client so repeated calls to the same API reuse connections
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """
+        Get the shared HTTP client, creating it on first use.
+
+        Returns:
+            Pooled httpx.AsyncClient
+        """
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                timeout=30.0,
+                # The client is shared by every user and agent: never keep
+                # cookies set by one API call for the next ones
+                cookies=CookieJar(policy=_RejectCookiesPolicy()),
+                follow_redirects=True,
+                event_hooks={"response": [_reject_oversized_response]},
+                limits=httpx.Limits(
+                    max_keepalive_connections=50,
+                    max_connections=200,
+                    keepalive_expiry=30
+                )
+            )
+        return cls._client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the shared HTTP client (called on application shutdown)."""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
     
     @staticmethod
     async def execute_function_call(
@@ -40,53 +237,42 @@ class APIExecutorService:
         Raises:
             ValueError: If function not found or execution fails
         """
-        print(f"\n[API EXECUTOR] === Executing function call ===")
-        print(f"[API EXECUTOR] Function name: {function_name}")
-        print(f"[API EXECUTOR] Arguments: {arguments}")
+        logger.debug("Executing function call %s with arguments %s", function_name, arguments)
 
         # Find the function in agent's available functions
-        function_def = None
-        for func in agent.available_functions:
-            if func["name"] == function_name:
-                function_def = func
-                break
+        function_def = _functions_index(agent).get(function_name)
 
         if not function_def:
-            print(f"[API EXECUTOR] ERROR: Function '{function_name}' not found")
+            logger.warning("Function %r not found in agent %s", function_name, agent.id)
             raise ValueError(f"Function '{function_name}' not found in agent's available functions")
 
-        print(f"[API EXECUTOR] Function found in agent's available functions")
-        
         # Get metadata
         metadata = function_def.get("_metadata", {})
         endpoint_id = metadata.get("endpoint_id")
 
         if not endpoint_id:
-            print(f"[API EXECUTOR] ERROR: No endpoint metadata found")
+            logger.warning("No endpoint metadata found for function %r", function_name)
             raise ValueError(f"No endpoint metadata found for function '{function_name}'")
 
-        print(f"[API EXECUTOR] Endpoint ID from metadata: {endpoint_id}")
+        # Get endpoint and its swagger doc (for base URL) in a single query
+        options = [joinedload(Endpoint.swagger_doc)]
+        if settings.DEBUG:
+            # Fail loudly on any other lazy load so N+1 regressions surface early
+            options.append(raiseload("*", sql_only=True))
 
-        # Get endpoint from database
-        endpoint = db.query(Endpoint).filter(Endpoint.id == endpoint_id).first()
+        endpoint = db.query(Endpoint).options(*options).filter(
+            Endpoint.id == endpoint_id
+        ).first()
         if not endpoint:
-            print(f"[API EXECUTOR] ERROR: Endpoint {endpoint_id} not found in database")
+            logger.warning("Endpoint %s not found in database", endpoint_id)
             raise ValueError(f"Endpoint {endpoint_id} not found")
 
-        print(f"[API EXECUTOR] Endpoint found: {endpoint.method} {endpoint.path}")
-
-        # Get swagger doc for base URL
-        swagger_doc = db.query(SwaggerDoc).filter(
-            SwaggerDoc.id == endpoint.swagger_doc_id
-        ).first()
+        swagger_doc = endpoint.swagger_doc
 
         if not swagger_doc:
-            print(f"[API EXECUTOR] ERROR: Swagger doc {endpoint.swagger_doc_id} not found")
+            logger.warning("Swagger doc %s not found", endpoint.swagger_doc_id)
             raise ValueError(f"Swagger doc {endpoint.swagger_doc_id} not found")
 
-        print(f"[API EXECUTOR] Swagger doc found: {swagger_doc.name} (base URL: {swagger_doc.base_url})")
-        print(f"[API EXECUTOR] Preparing HTTP request...")
-
         # Execute the HTTP request
         return await APIExecutorService._execute_http_request(
             endpoint=endpoint,
@@ -111,44 +297,33 @@ class APIExecutorService:
         Returns:
             API response
         """
-        print(f"\n[HTTP REQUEST] Building HTTP request...")
-        print(f"[HTTP REQUEST] Method: {endpoint.method}")
-        print(f"[HTTP REQUEST] Path template: {endpoint.path}")
+        method = endpoint.method.upper()
 
         # Build URL
         base_url = swagger_doc.base_url or ""
         path = endpoint.path
 
+        path_names, query_names, header_names = _parameter_names(endpoint)
+
         # Replace path parameters
-        path_params = {}
-        if endpoint.parameters and endpoint.parameters.get("path"):
-            print(f"[HTTP REQUEST] Processing {len(endpoint.parameters['path'])} path parameters")
-            for param in endpoint.parameters["path"]:
-                param_name = param.get("name")
-                if param_name and param_name in arguments:
-                    old_path = path
-                    path = path.replace(f"{{{param_name}}}", str(arguments[param_name]))
-                    path_params[param_name] = arguments[param_name]
-                    print(f"[HTTP REQUEST] Replaced path param '{param_name}': {old_path} -> {path}")
+        path_params = {n: arguments[n] for n in path_names if n in arguments}
+        if path_params:
+            tokens = list(_compile_path(path))
+            for i in range(1, len(tokens), 2):
+                name = tokens[i]
+                tokens[i] = str(path_params[name]) if name in path_params else f"{{{name}}}"
+            path = "".join(tokens)
         
-        # Build full URL
-        if base_url:
+        # Build full URL (plain concatenation unless the path needs real URL resolution)
+        if not base_url:
+            url = path
+        elif path.startswith(("http://", "https://")) or ".." in path:
             url = urljoin(base_url.rstrip('/') + '/', path.lstrip('/'))
         else:
-            url = path
-
-        print(f"[HTTP REQUEST] Full URL: {url}")
+            url = f"{base_url.rstrip('/')}/{path.lstrip('/')}"
 
         # Prepare query parameters
-        query_params = {}
-        if endpoint.parameters and endpoint.parameters.get("query"):
-            print(f"[HTTP REQUEST] Processing {len(endpoint.parameters['query'])} query parameters")
-            for param in endpoint.parameters["query"]:
-                param_name = param.get("name")
-                if param_name and param_name in arguments:
-                    query_params[param_name] = arguments[param_name]
-            if query_params:
-                print(f"[HTTP REQUEST] Query params: {query_params}")
+        query_params = {n: arguments[n] for n in query_names if n in arguments}
         
         # Prepare headers
         headers = {
@@ -157,83 +332,75 @@ class APIExecutorService:
         }
         
         # Add header parameters
-        if endpoint.parameters and endpoint.parameters.get("header"):
-            for param in endpoint.parameters["header"]:
-                param_name = param.get("name")
-                if param_name and param_name in arguments:
-                    headers[param_name] = str(arguments[param_name])
+        for param_name in header_names:
+            if param_name in arguments:
+                headers[param_name] = str(arguments[param_name])
         
         # Prepare request body
         body = None
-        if endpoint.request_body and endpoint.method.upper() in ["POST", "PUT", "PATCH"]:
+        if endpoint.request_body and method in _BODY_METHODS:
             # Get body from arguments
             # If there's a 'body' argument, use it
             if "body" in arguments:
                 body = arguments["body"]
             else:
-                # Otherwise, collect non-path/query params as body
-                body = {}
-                used_params = set(path_params.keys()) | set(query_params.keys())
-                for key, value in arguments.items():
-                    if key not in used_params and not key.startswith("_"):
-                        body[key] = value
-            if body:
-                print(f"[HTTP REQUEST] Request body: {body}")
+                # Otherwise, collect non-path/query/header params as body
+                body = {
+                    key: value for key, value in arguments.items()
+                    if key not in path_names
+                    and key not in query_names
+                    and key not in header_names
+                    and not key.startswith("_")
+                }
 
         # Make the HTTP request
-        method = endpoint.method.upper()
-        print(f"\n[HTTP REQUEST] Executing {method} request to {url}...")
+        logger.debug("%s %s params=%s body=%s", method, url, query_params, body)
 
         try:
-            async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-                if method == "GET":
-                    response = await client.get(url, params=query_params, headers=headers)
-                elif method == "POST":
-                    response = await client.post(url, params=query_params, json=body, headers=headers)
-                elif method == "PUT":
-                    response = await client.put(url, params=query_params, json=body, headers=headers)
-                elif method == "PATCH":
-                    response = await client.patch(url, params=query_params, json=body, headers=headers)
-                elif method == "DELETE":
-                    response = await client.delete(url, params=query_params, headers=headers)
-                elif method == "HEAD":
-                    response = await client.head(url, params=query_params, headers=headers)
-                elif method == "OPTIONS":
-                    response = await client.options(url, params=query_params, headers=headers)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-
-                print(f"[HTTP REQUEST] Response received: HTTP {response.status_code}")
-
-                # Parse response
-                result = {
-                    "success": True,
-                    "status_code": response.status_code,
-                    "url": str(response.url),
-                    "method": method
-                }
+            if method not in _ALLOWED_METHODS:
+                raise ValueError(f"Unsupported HTTP method: {method}")
+
+            client = APIExecutorService.get_client()
+            async with client.stream(
+                method,
+                url,
+                params=query_params,
+                json=body if method in _BODY_METHODS else None,
+                headers=headers
+            ) as response:
+                logger.debug(
+                    "%s %s -> HTTP %s (content-length: %s)",
+                    method, url, response.status_code, response.headers.get("content-length")
+                )
+                content = await _read_capped(response)
 
-                # Try to parse JSON response
-                try:
-                    result["data"] = response.json()
-                    print(f"[HTTP REQUEST] Response is JSON (size: {len(str(result['data']))} chars)")
-                except Exception:
-                    # If not JSON, return text
-                    result["data"] = response.text
-                    print(f"[HTTP REQUEST] Response is text (size: {len(response.text)} chars)")
-
-                # Check if request was successful
-                if response.status_code >= 400:
-                    result["success"] = False
-                    result["error"] = f"HTTP {response.status_code}: {response.text[:200]}"
-                    print(f"[HTTP REQUEST] Request FAILED: {result['error']}")
-                else:
-                    print(f"[HTTP REQUEST] Request SUCCESSFUL")
-
-                return result
-                
+            # Parse response
+            result = {
+                "success": True,
+                "status_code": response.status_code,
+                "url": str(response.url),
+                "method": method
+            }
+
+            # Parse the body from bytes
+            encoding = response.charset_encoding or "utf-8"
+
+            # Try to parse JSON response
+            try:
+                result["data"] = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                # If not JSON, return text
+                result["data"] = content.decode(encoding, errors="replace")
+
+            # Check if request was successful
+            if response.status_code >= 400:
+                result["success"] = False
+                result["error"] = f"HTTP {response.status_code}: {content[:200].decode(encoding, errors='replace')}"
+
+            return result
+            
         except httpx.TimeoutException:
-            print(f"[HTTP REQUEST] ERROR: Request timeout")
+            logger.warning("%s %s timed out", method, url)
             return {
                 "success": False,
                 "error": "Request timeout - the API took too long to respond",
@@ -242,7 +409,7 @@ class APIExecutorService:
                 "method": method
             }
         except httpx.ConnectError:
-            print(f"[HTTP REQUEST] ERROR: Connection failed to {url}")
+            logger.warning("Connection failed to %s", url)
             return {
                 "success": False,
                 "error": f"Could not connect to {url}",
@@ -251,7 +418,7 @@ class APIExecutorService:
                 "method": method
             }
         except Exception as e:
-            print(f"[HTTP REQUEST] ERROR: {str(e)}")
+            logger.warning("%s %s failed: %s", method, url, e)
             return {
                 "success": False,
                 "error": f"Execution error: {str(e)}",
@@ -271,16 +438,19 @@ class APIExecutorService:
         Returns:
             Formatted string for LLM
         """
-        if result.get("success"):
-            data = result.get("data", {})
-            if isinstance(data, dict) or isinstance(data, list):
-                return json.dumps(data, indent=2, ensure_ascii=False)
-            return str(data)
-        else:
+        if not result.get("success"):
             error = result.get("error", "Unknown error")
             status = result.get("status_code", 0)
             return f"Error {status}: {error}"
 
+        data = result.get("data", {})
+        if isinstance(data, (dict, list)):
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+        if isinstance(data, str):
+            # Text bodies were already decoded upstream
+            return data
+        return str(data)
+
 
 # Singleton instance
 api_executor = APIExecutorService()
\ No newline at end of file
@@ -4,16 +4,274 @@ LLM Service
 Handles communication with different LLM providers using user's personal API keys.
 Supports OpenAI, Anthropic, and local Ollama.
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple, Union
+from contextlib import aclosing
+import asyncio
+import copy
+import hashlib
+import itertools
+import logging
+import random
+import threading
 import httpx
+import orjson
+from cachetools import TTLCache
 from app.models.user import User
 from app.models.agent import Agent
 from app.core.encryption import decrypt_api_key
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Cap on concurrent in-flight requests per provider
+_SEMAPHORES = {
+    "openai": asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY),
+    "anthropic": asyncio.Semaphore(settings.ANTHROPIC_MAX_CONCURRENCY),
+    "ollama": asyncio.Semaphore(settings.OLLAMA_MAX_CONCURRENCY),
+}
+
+# Ollama endpoint (default local)
+OLLAMA_CHAT_URL = "http://localhost:11434/api/chat"
+_OLLAMA_UNAVAILABLE = (
+    "Could not connect to Ollama. Make sure Ollama is running locally "
+    "(install from https://ollama.com and run 'ollama serve')"
+)
+
+# Sequence for the ids of converted Ollama responses (Ollama doesn't provide one)
+_ollama_ids = itertools.count(1)
+
+# Fail fast on connect/write/pool waits; only reading the generated
+# answer is allowed to take long (local models are slower)
+_TIMEOUTS = {
+    "openai": httpx.Timeout(connect=3.0, read=60.0, write=5.0, pool=2.0),
+    "anthropic": httpx.Timeout(connect=3.0, read=60.0, write=5.0, pool=2.0),
+    "ollama": httpx.Timeout(connect=3.0, read=120.0, write=5.0, pool=2.0),
+}
+
+# Keys of a message Anthropic accepts as-is
+_ANTHROPIC_MESSAGE_KEYS = frozenset(("role", "content"))
+
+# Rate limiting and transient server errors worth retrying
+_RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+# Failures to get a connection, where the request never reached the
+# provider. Read timeouts are not retried: the model was generating and
+# a retry would start over (read timeouts are up to 60-120 s).
+_RETRY_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Decrypted API keys, keyed by (user id, provider, hash of the encrypted key)
+# so that storing a new key naturally misses the cache
+_API_KEY_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=300)
+# Key updates run in the threadpool (sync endpoints), lookups on the event loop
+_API_KEY_CACHE_LOCK = threading.Lock()
+
+# Completions of deterministic (temperature 0) requests, keyed by who
+# sends them (user and encrypted API key, so a revoked key can't be served
+# from it), the agent (id, updated_at) and a digest of the messages
+_COMPLETION_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Compute how long to wait before the next attempt.
+
+    Args:
+        attempt: Number of the attempt that just failed (1-based)
+        retry_after: Optional Retry-After header value (seconds)
+
+    Returns:
+        Delay in seconds
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), 30.0)
+        except ValueError:
+            pass
+    # Exponential backoff with jitter: ~1s, 2s, 4s... capped at 10s
+    return min(2 ** (attempt - 1), 10) + random.uniform(0, 1)
+
+
+def _convert_functions(functions: List[Dict[str, Any]], provider: str) -> List[Dict[str, Any]]:
+    """
+    Convert agent function definitions to a provider's schema.
+
+    Args:
+        functions: Agent function definitions
+        provider: Provider name (openai, anthropic)
+
+    Returns:
+        OpenAI functions or Anthropic tools, without execution metadata
+    """
+    # Anthropic calls the parameters schema "input_schema"
+    schema_key = "input_schema" if provider == "anthropic" else "parameters"
+    return [
+        {
+            "name": func["name"],
+            "description": func["description"],
+            schema_key: func["parameters"]
+        }
+        for func in functions
+    ]
+
+
+# Fixed part (everything but the messages) of agents' request payloads,
+# keyed by (agent id, updated_at, provider, has functions)
+_PAYLOAD_SKELETON_CACHE: TTLCache = TTLCache(maxsize=512, ttl=300)
+
+
+def _payload_skeleton(
+    agent: Agent,
+    functions: Optional[List[Dict[str, Any]]],
+    provider: str
+) -> Dict[str, Any]:
+    """
+    Get the fixed part of an agent's request payload for a provider.
+
+    Model, sampling settings and functions are the same on every turn,
+    so when the request uses the agent's own functions the skeleton is
+    built once, with the function schemas serialized up front and
+    spliced as-is into every request body; requests only add messages.
+
+    Args:
+        agent: Agent instance
+        functions: Function definitions of the request
+        provider: Provider name (openai, anthropic)
+
+    Returns:
+        Payload without messages (must not be modified)
+    """
+    cacheable = not functions or functions is agent.available_functions
+    key = (agent.id, agent.updated_at, provider, bool(functions))
+    if cacheable:
+        skeleton = _PAYLOAD_SKELETON_CACHE.get(key)
+        if skeleton is not None:
+            return skeleton
+
+    skeleton = {
+        "model": agent.llm_model,
+        "temperature": agent.temperature_float,
+        "max_tokens": agent.max_tokens
+    }
+
+    if functions:
+        converted = _convert_functions(functions, provider)
+        if cacheable:
+            converted = orjson.Fragment(orjson.dumps(converted, option=orjson.OPT_NON_STR_KEYS))
+        if provider == "anthropic":
+            # Anthropic uses "tools" instead of "functions"
+            skeleton["tools"] = converted
+        else:
+            skeleton["functions"] = converted
+            skeleton["function_call"] = "auto"
+
+    if cacheable:
+        _PAYLOAD_SKELETON_CACHE[key] = skeleton
+    return skeleton
+
 
 class LLMService:
     """Service for interacting with LLM providers."""
+
+    # One pooled HTTP client per provider so connections to each
+    # provider's host are kept alive and reused across calls
+    _clients: Dict[str, httpx.AsyncClient] = {}
+
+    @classmethod
+    def get_client(cls, provider: str) -> httpx.AsyncClient:
+        """
+        Get the shared HTTP client of a provider, creating it on first use.
+
+        Args:
+            provider: Provider name (openai, anthropic, ollama)
+
+        Returns:
+            Pooled httpx.AsyncClient
+        """
+        client = cls._clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=True,
+                timeout=_TIMEOUTS[provider],
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+            )
+            cls._clients[provider] = client
+        return client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the shared HTTP clients (called on application shutdown)."""
+        for client in cls._clients.values():
+            await client.aclose()
+        cls._clients.clear()
+
+    @staticmethod
+    async def _post(provider: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        POST to a provider with bounded concurrency and retries.
+
+        Rate-limited (429), 5xx and connection failures are retried with
+        exponential backoff, honouring Retry-After when present.
+
+        Args:
+            provider: Provider name (openai, anthropic, ollama)
+            url: Request URL
+            **kwargs: Extra arguments for httpx.AsyncClient.post
+
+        Returns:
+            Successful response
+
+        Raises:
+            httpx.HTTPStatusError: If the provider returns an error status
+            httpx.TransportError: If the provider can't be reached
+        """
+        client = LLMService.get_client(provider)
+        attempt = 0
+
+        while True:
+            attempt += 1
+            try:
+                async with _SEMAPHORES[provider]:
+                    response = await client.post(url, **kwargs)
+            except _RETRY_TRANSPORT_ERRORS:
+                if attempt >= settings.LLM_MAX_ATTEMPTS:
+                    raise
+                delay = _retry_delay(attempt)
+            else:
+                if response.status_code not in _RETRY_STATUS_CODES or attempt >= settings.LLM_MAX_ATTEMPTS:
+                    response.raise_for_status()
+                    return response
+                delay = _retry_delay(attempt, response.headers.get("retry-after"))
+
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _stream_lines(provider: str, url: str, **kwargs: Any) -> AsyncIterator[str]:
+        """
+        POST to a provider and yield the non-empty lines of the streamed body.
+
+        The provider's concurrency slot is held until the stream is exhausted.
+        Streams are not retried, since part of the answer may already have
+        been forwarded to the caller.
+
+        Args:
+            provider: Provider name (openai, anthropic, ollama)
+            url: Request URL
+            **kwargs: Extra arguments for httpx.AsyncClient.stream
+
+        Yields:
+            Response lines as they arrive
+
+        Raises:
+            httpx.HTTPStatusError: If the provider returns an error status
+        """
+        client = LLMService.get_client(provider)
+        async with _SEMAPHORES[provider]:
+            async with client.stream("POST", url, **kwargs) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield line
     
     @staticmethod
     def get_api_key(user: User, provider: str) -> Optional[str]:
@@ -31,18 +289,18 @@ class LLMService:
             ValueError: If provider requires key but user doesn't have one
         """
         if provider == "openai":
-            if not user.openai_api_key:
+            encrypted_key = user.openai_api_key
+            if not encrypted_key:
                 raise ValueError(
                     "OpenAI API key required. Please add your API key in your profile settings."
                 )
-            return decrypt_api_key(user.openai_api_key)
         
         elif provider == "anthropic":
-            if not user.anthropic_api_key:
+            encrypted_key = user.anthropic_api_key
+            if not encrypted_key:
                 raise ValueError(
                     "Anthropic API key required. Please add your API key in your profile settings."
                 )
-            return decrypt_api_key(user.anthropic_api_key)
         
         elif provider == "ollama":
             # Ollama doesn't need an API key (local)
@@ -50,6 +308,30 @@ class LLMService:
         
         else:
             raise ValueError(f"Unknown LLM provider: {provider}")
+
+        cache_key = (user.id, provider, hash(encrypted_key))
+        with _API_KEY_CACHE_LOCK:
+            api_key = _API_KEY_CACHE.get(cache_key)
+        if api_key is None:
+            api_key = decrypt_api_key(encrypted_key)
+            if api_key is not None:
+                with _API_KEY_CACHE_LOCK:
+                    _API_KEY_CACHE[cache_key] = api_key
+        return api_key
+
+    @staticmethod
+    def invalidate_api_keys(user_id: int) -> None:
+        """
+        Drop the cached decrypted API keys of a user.
+
+        Must be called whenever the user's API keys are changed or removed.
+
+        Args:
+            user_id: User ID
+        """
+        with _API_KEY_CACHE_LOCK:
+            for key in [k for k in _API_KEY_CACHE if k[0] == user_id]:
+                _API_KEY_CACHE.pop(key, None)
     
     @staticmethod
     async def chat_completion(
@@ -71,36 +353,135 @@ class LLMService:
             LLM response
         """
         provider = agent.llm_provider
-        print(f"\n[LLM SERVICE] === Chat completion request ===")
-        print(f"[LLM SERVICE] Provider: {provider}")
-        print(f"[LLM SERVICE] Model: {agent.llm_model}")
-        print(f"[LLM SERVICE] Messages count: {len(messages)}")
-        print(f"[LLM SERVICE] Functions available: {len(functions) if functions else 0}")
+        logger.debug(
+            "Chat completion request: provider=%s model=%s messages=%d functions=%d",
+            provider, agent.llm_model, len(messages), len(functions) if functions else 0
+        )
+
+        # Deterministic requests get the same answer, so identical ones
+        # (retries, validation loops...) are served from the cache. The
+        # agent's settings and functions are identified by its id and
+        # updated_at, so only the messages are hashed.
+        cache_key = None
+        if agent.temperature_float == 0 and (not functions or functions is agent.available_functions):
+            cache_key = (
+                user.id, getattr(user, f"{provider}_api_key", None),
+                agent.id, agent.updated_at, bool(functions),
+                hashlib.blake2b(orjson.dumps(messages, option=orjson.OPT_NON_STR_KEYS)).digest()
+            )
+            cached = _COMPLETION_CACHE.get(cache_key)
+            if cached is not None:
+                logger.debug("Chat completion served from cache")
+                # Callers may modify the response, never hand out the cached one
+                return copy.deepcopy(cached)
 
         if provider == "openai":
-            return await LLMService._openai_chat_completion(
+            result = await LLMService._openai_chat_completion(
                 user, agent, messages, functions
             )
         elif provider == "anthropic":
-            return await LLMService._anthropic_chat_completion(
+            result = await LLMService._anthropic_chat_completion(
                 user, agent, messages, functions
             )
         elif provider == "ollama":
-            return await LLMService._ollama_chat_completion(
+            result = await LLMService._ollama_chat_completion(
                 agent, messages, functions
             )
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}")
+
+        if cache_key is not None:
+            _COMPLETION_CACHE[cache_key] = copy.deepcopy(result)
+        return result
+
+    @staticmethod
+    async def chat_completion_stream(
+        user: User,
+        agent: Agent,
+        messages: List[Dict[str, str]],
+        functions: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a chat completion using the agent's configuration.
+        
+        Chunks are yielded as soon as the provider sends them, in the
+        OpenAI "chat.completion.chunk" format whatever the provider.
+        
+        Args:
+            user: User instance (for API key)
+            agent: Agent instance (for LLM config)
+            messages: Chat messages
+            functions: Optional function definitions for function calling
+            
+        Yields:
+            OpenAI-like completion chunks
+        """
+        provider = agent.llm_provider
+        logger.debug(
+            "Chat completion stream: provider=%s model=%s messages=%d functions=%d",
+            provider, agent.llm_model, len(messages), len(functions) if functions else 0
+        )
+
+        if provider == "openai":
+            url, headers, payload = LLMService._openai_request(user, agent, messages, functions)
+            payload["stream"] = True
+            # aclosing() ends the HTTP stream as soon as the loop is left,
+            # instead of leaving it to garbage collection
+            async with aclosing(LLMService._stream_lines(
+                "openai", url, headers=headers, content=orjson.dumps(payload)
+            )) as lines:
+                async for line in lines:
+                    if not line.startswith("data: "):
+                        continue
+                    if line == "data: [DONE]":
+                        break
+                    yield orjson.loads(line[6:])
+
+        elif provider == "anthropic":
+            url, headers, payload = LLMService._anthropic_request(user, agent, messages, functions)
+            payload["stream"] = True
+            message_id = None
+            async with aclosing(LLMService._stream_lines(
+                "anthropic", url, headers=headers, content=orjson.dumps(payload)
+            )) as lines:
+                async for line in lines:
+                    if not line.startswith("data: "):
+                        continue
+                    event = orjson.loads(line[6:])
+                    if event.get("type") == "message_start":
+                        message_id = event.get("message", {}).get("id")
+                    chunk = LLMService._convert_anthropic_event_to_openai_chunk(event, message_id)
+                    if chunk:
+                        yield chunk
+
+        elif provider == "ollama":
+            payload = LLMService._ollama_payload(agent, messages, functions)
+            payload["stream"] = True
+            try:
+                async with aclosing(LLMService._stream_lines(
+                    "ollama",
+                    OLLAMA_CHAT_URL,
+                    headers={"Content-Type": "application/json"},
+                    content=orjson.dumps(payload)
+                )) as lines:
+                    async for line in lines:
+                        yield LLMService._convert_ollama_chunk_to_openai_format(orjson.loads(line))
+            except httpx.ConnectError:
+                logger.warning("Could not connect to Ollama at %s", OLLAMA_CHAT_URL)
+                raise ValueError(_OLLAMA_UNAVAILABLE)
+
+        else:
+            raise ValueError(f"Unsupported LLM provider: {provider}")
     
     @staticmethod
-    async def _openai_chat_completion(
+    def _openai_request(
         user: User,
         agent: Agent,
         messages: List[Dict[str, str]],
         functions: Optional[List[Dict[str, Any]]] = None
-    ) -> Dict[str, Any]:
+    ) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
         """
-        OpenAI chat completion.
+        Build an OpenAI chat completion request.
         
         Args:
             user: User instance
@@ -109,79 +490,76 @@ class LLMService:
             functions: Function definitions
             
         Returns:
-            OpenAI response
+            Tuple of (url, headers, payload)
         """
-        print(f"[LLM SERVICE - OPENAI] Getting API key...")
         api_key = LLMService.get_api_key(user, "openai")
-        print(f"[LLM SERVICE - OPENAI] API key retrieved")
 
-        # Prepare request
-        payload = {
-            "model": agent.llm_model,
-            "messages": messages,
-            "temperature": agent.temperature_float,
-            "max_tokens": agent.max_tokens
-        }
+        # Prepare request (functions are stripped of their metadata,
+        # OpenAI doesn't need it)
+        payload = {**_payload_skeleton(agent, functions, "openai"), "messages": messages}
 
-        # Add functions if provided
-        if functions:
-            # Remove metadata from functions (OpenAI doesn't need it)
-            clean_functions = []
-            for func in functions:
-                clean_func = {
-                    "name": func["name"],
-                    "description": func["description"],
-                    "parameters": func["parameters"]
-                }
-                clean_functions.append(clean_func)
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        return "https://api.openai.com/v1/chat/completions", headers, payload
 
-            payload["functions"] = clean_functions
-            payload["function_call"] = "auto"
-            print(f"[LLM SERVICE - OPENAI] Prepared {len(clean_functions)} functions for OpenAI")
+    @staticmethod
+    async def _openai_chat_completion(
+        user: User,
+        agent: Agent,
+        messages: List[Dict[str, str]],
+        functions: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        OpenAI chat completion.
+        
+        Args:
+            user: User instance
+            agent: Agent instance
+            messages: Chat messages
+            functions: Function definitions
+            
+        Returns:
+            OpenAI response
+        """
+        url, headers, payload = LLMService._openai_request(user, agent, messages, functions)
 
         # Make request to OpenAI
-        print(f"[LLM SERVICE - OPENAI] Sending request to OpenAI API...")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=60.0
+        response = await LLMService._post(
+            "openai",
+            url,
+            headers=headers,
+            content=orjson.dumps(payload)
+        )
+        result = orjson.loads(response.content)
+        if logger.isEnabledFor(logging.DEBUG) and result.get("choices"):
+            logger.debug(
+                "OpenAI response received (function call: %s)",
+                "function_call" in result["choices"][0].get("message", {})
             )
-            response.raise_for_status()
-            result = response.json()
-            print(f"[LLM SERVICE - OPENAI] Response received from OpenAI")
-            if result.get("choices") and len(result["choices"]) > 0:
-                message = result["choices"][0].get("message", {})
-                has_function_call = "function_call" in message
-                print(f"[LLM SERVICE - OPENAI] Response has function call: {has_function_call}")
-            return result
+        return result
     
     @staticmethod
-    async def _anthropic_chat_completion(
+    def _anthropic_request(
         user: User,
         agent: Agent,
         messages: List[Dict[str, str]],
         functions: Optional[List[Dict[str, Any]]] = None
-    ) -> Dict[str, Any]:
+    ) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
         """
-        Anthropic (Claude) chat completion.
+        Build an Anthropic (Claude) messages request.
         
         Args:
             user: User instance
             agent: Agent instance
-            messages: Chat messages
+            messages: Chat messages (OpenAI format)
             functions: Function definitions
             
         Returns:
-            Anthropic response formatted as OpenAI-like
+            Tuple of (url, headers, payload)
         """
-        print(f"[LLM SERVICE - ANTHROPIC] Getting API key...")
         api_key = LLMService.get_api_key(user, "anthropic")
-        print(f"[LLM SERVICE - ANTHROPIC] API key retrieved")
 
         # Convert messages format (OpenAI -> Anthropic)
         # Anthropic uses system parameter separately
@@ -190,69 +568,71 @@ class LLMService:
 
         for msg in messages:
             if msg["role"] == "system":
+                # The last system message wins
                 system_message = msg["content"]
+            elif msg.keys() == _ANTHROPIC_MESSAGE_KEYS:
+                # Plain {role, content} messages are passed through as-is
+                anthropic_messages.append(msg)
             else:
-                anthropic_messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-
-        print(f"[LLM SERVICE - ANTHROPIC] Converted {len(messages)} messages to Anthropic format")
+                # Others (e.g. carrying function_call) are trimmed since
+                # Anthropic rejects extra keys
+                anthropic_messages.append({"role": msg["role"], "content": msg["content"]})
 
         # Prepare request
-        payload = {
-            "model": agent.llm_model,
-            "messages": anthropic_messages,
-            "max_tokens": agent.max_tokens,
-            "temperature": agent.temperature_float
-        }
+        payload = {**_payload_skeleton(agent, functions, "anthropic"), "messages": anthropic_messages}
 
         if system_message:
             payload["system"] = system_message
 
-        # Add tools if provided (Anthropic uses "tools" instead of "functions")
-        if functions:
-            tools = []
-            for func in functions:
-                tool = {
-                    "name": func["name"],
-                    "description": func["description"],
-                    "input_schema": func["parameters"]
-                }
-                tools.append(tool)
-            payload["tools"] = tools
-            print(f"[LLM SERVICE - ANTHROPIC] Prepared {len(tools)} tools for Anthropic")
+        headers = {
+            "x-api-key": api_key,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json"
+        }
+        return "https://api.anthropic.com/v1/messages", headers, payload
+
+    @staticmethod
+    async def _anthropic_chat_completion(
+        user: User,
+        agent: Agent,
+        messages: List[Dict[str, str]],
+        functions: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Anthropic (Claude) chat completion.
+        
+        Args:
+            user: User instance
+            agent: Agent instance
+            messages: Chat messages
+            functions: Function definitions
+            
+        Returns:
+            Anthropic response formatted as OpenAI-like
+        """
+        url, headers, payload = LLMService._anthropic_request(user, agent, messages, functions)
 
         # Make request to Anthropic
-        print(f"[LLM SERVICE - ANTHROPIC] Sending request to Anthropic API...")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "x-api-key": api_key,
-                    "anthropic-version": "2023-06-01",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=60.0
-            )
-            response.raise_for_status()
-
-            # Convert Anthropic response to OpenAI format
-            anthropic_response = response.json()
-            print(f"[LLM SERVICE - ANTHROPIC] Response received from Anthropic")
-            result = LLMService._convert_anthropic_to_openai_format(anthropic_response)
-            print(f"[LLM SERVICE - ANTHROPIC] Converted to OpenAI format")
-            return result
+        response = await LLMService._post(
+            "anthropic",
+            url,
+            headers=headers,
+            content=orjson.dumps(payload)
+        )
+
+        # Convert Anthropic response to OpenAI format
+        anthropic_response = orjson.loads(response.content)
+        logger.debug("Anthropic response received (stop reason: %s)", anthropic_response.get("stop_reason"))
+        return LLMService._convert_anthropic_to_openai_format(anthropic_response)
     
     @staticmethod
-    async def _ollama_chat_completion(
+    def _ollama_payload(
         agent: Agent,
         messages: List[Dict[str, str]],
         functions: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
-        Ollama chat completion (local).
+        Build an Ollama chat request payload.
         
         Args:
             agent: Agent instance
@@ -260,59 +640,67 @@ class LLMService:
             functions: Function definitions
             
         Returns:
-            Ollama response formatted as OpenAI-like
+            Request payload
         """
-        print(f"[LLM SERVICE - OLLAMA] Using local Ollama")
-        # Ollama endpoint (default local)
-        ollama_url = "http://localhost:11434/api/chat"
+        # Ollama doesn't have native function calling like OpenAI
+        # We can include functions in the system prompt as a workaround
+        if functions:
+            functions_description = "\n\nAvailable functions:\n" + "".join(
+                f"\n- {func['name']}: {func['description']}" for func in functions
+            )
+            
+            # Extend the first system message or create one, on a new list
+            # so the caller's messages are left untouched
+            if messages and messages[0]["role"] == "system":
+                system_message = {**messages[0], "content": messages[0]["content"] + functions_description}
+                messages = [system_message, *messages[1:]]
+            else:
+                messages = [
+                    {"role": "system", "content": f"You are a helpful assistant.{functions_description}"},
+                    *messages
+                ]
 
-        # Prepare request
-        payload = {
+        return {
             "model": agent.llm_model,
             "messages": messages,
             "stream": False
         }
 
-        # Ollama doesn't have native function calling like OpenAI
-        # We can include functions in the system prompt as a workaround
-        if functions:
-            print(f"[LLM SERVICE - OLLAMA] Adding {len(functions)} functions to system prompt")
-            functions_description = "\n\nAvailable functions:\n"
-            for func in functions:
-                functions_description += f"\n- {func['name']}: {func['description']}"
+    @staticmethod
+    async def _ollama_chat_completion(
+        agent: Agent,
+        messages: List[Dict[str, str]],
+        functions: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Ollama chat completion (local).
+        
+        Args:
+            agent: Agent instance
+            messages: Chat messages
+            functions: Function definitions
             
-            # Add to first system message or create one
-            if messages and messages[0]["role"] == "system":
-                messages[0]["content"] += functions_description
-            else:
-                messages.insert(0, {
-                    "role": "system",
-                    "content": f"You are a helpful assistant.{functions_description}"
-                })
+        Returns:
+            Ollama response formatted as OpenAI-like
+        """
+        payload = LLMService._ollama_payload(agent, messages, functions)
         
         # Make request to Ollama
-        print(f"[LLM SERVICE - OLLAMA] Sending request to Ollama...")
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    ollama_url,
-                    json=payload,
-                    timeout=120.0
-                )
-                response.raise_for_status()
-
-                # Convert Ollama response to OpenAI format
-                ollama_response = response.json()
-                print(f"[LLM SERVICE - OLLAMA] Response received from Ollama")
-                result = LLMService._convert_ollama_to_openai_format(ollama_response)
-                print(f"[LLM SERVICE - OLLAMA] Converted to OpenAI format")
-                return result
-        except httpx.ConnectError:
-            print(f"[LLM SERVICE - OLLAMA] ERROR: Could not connect to Ollama")
-            raise ValueError(
-                "Could not connect to Ollama. Make sure Ollama is running locally "
-                "(install from https://ollama.com and run 'ollama serve')"
+            response = await LLMService._post(
+                "ollama",
+                OLLAMA_CHAT_URL,
+                headers={"Content-Type": "application/json"},
+                content=orjson.dumps(payload)
             )
+
+            # Convert Ollama response to OpenAI format
+            ollama_response = orjson.loads(response.content)
+            logger.debug("Ollama response received")
+            return LLMService._convert_ollama_to_openai_format(ollama_response)
+        except httpx.ConnectError:
+            logger.warning("Could not connect to Ollama at %s", OLLAMA_CHAT_URL)
+            raise ValueError(_OLLAMA_UNAVAILABLE)
     
     @staticmethod
     def _convert_anthropic_to_openai_format(anthropic_response: Dict[str, Any]) -> Dict[str, Any]:
@@ -320,12 +708,12 @@ class LLMService:
         content = anthropic_response.get("content", [])
         
         # Extract text content
-        text_content = ""
+        text_parts = []
         tool_calls = []
         
         for block in content:
             if block.get("type") == "text":
-                text_content += block.get("text", "")
+                text_parts.append(block.get("text", ""))
             elif block.get("type") == "tool_use":
                 # Convert tool use to function call
                 tool_calls.append({
@@ -337,6 +725,8 @@ class LLMService:
                     }
                 })
         
+        text_content = "".join(text_parts)
+        
         # Build OpenAI-like response
         message = {
             "role": "assistant",
@@ -374,7 +764,7 @@ class LLMService:
         message = ollama_response.get("message", {})
         
         return {
-            "id": "ollama-" + str(hash(str(ollama_response))),
+            "id": f"ollama-{next(_ollama_ids)}",
             "object": "chat.completion",
             "created": 0,
             "model": ollama_response.get("model"),
@@ -396,5 +786,73 @@ class LLMService:
         }
 
 
+    @staticmethod
+    def _convert_anthropic_event_to_openai_chunk(
+        event: Dict[str, Any],
+        message_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Convert an Anthropic stream event to an OpenAI completion chunk.
+        
+        Args:
+            event: Anthropic server-sent event payload
+            message_id: ID of the message being streamed
+            
+        Returns:
+            OpenAI-like chunk, or None for events without content
+        """
+        event_type = event.get("type")
+        delta: Dict[str, Any] = {}
+        finish_reason = None
+
+        if event_type == "content_block_start":
+            block = event.get("content_block", {})
+            if block.get("type") != "tool_use":
+                return None
+            delta["function_call"] = {"name": block.get("name"), "arguments": ""}
+        elif event_type == "content_block_delta":
+            block_delta = event.get("delta", {})
+            if block_delta.get("type") == "text_delta":
+                delta["content"] = block_delta.get("text", "")
+            elif block_delta.get("type") == "input_json_delta":
+                delta["function_call"] = {"arguments": block_delta.get("partial_json", "")}
+            else:
+                return None
+        elif event_type == "message_delta":
+            finish_reason = event.get("delta", {}).get("stop_reason")
+        else:
+            return None
+
+        return {
+            "id": message_id,
+            "object": "chat.completion.chunk",
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": delta,
+                    "finish_reason": finish_reason
+                }
+            ]
+        }
+
+    @staticmethod
+    def _convert_ollama_chunk_to_openai_format(ollama_chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a streamed Ollama response line to an OpenAI completion chunk."""
+        message = ollama_chunk.get("message", {})
+
+        return {
+            "id": None,
+            "object": "chat.completion.chunk",
+            "model": ollama_chunk.get("model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"content": message.get("content", "")},
+                    "finish_reason": "stop" if ollama_chunk.get("done") else None
+                }
+            ]
+        }
+
+
 # Singleton instance
 llm_service = LLMService()
\ No newline at end of file
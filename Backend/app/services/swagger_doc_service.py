@@ -4,14 +4,62 @@ SwaggerDoc Service
 This service handles CRUD operations for Swagger documents
 and orchestrates parsing and storage.
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+import threading
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from fastapi import UploadFile
+from cachetools import TTLCache
+from anyio import CapacityLimiter, to_thread
 
+from app.core.config import settings
 from app.models.swagger_doc import SwaggerDoc
 from app.models.endpoint import Endpoint
 from app.schemas.swagger_doc import SwaggerDocCreate, SwaggerDocUpdate, SwaggerDocCreateDirect
 from app.services.swagger_parser import swagger_parser
+from app.services.agent_generator import build_function_name
+
+# (updated_at, endpoint rows as plain dicts) of Swagger docs, keyed by
+# doc id. Endpoints never change once imported; entries are only served
+# while the doc's updated_at matches, and ownership is checked each time.
+_ENDPOINTS_CACHE: TTLCache = TTLCache(maxsize=256, ttl=300)
+_ENDPOINTS_CACHE_LOCK = threading.Lock()
+
+# Endpoint columns returned by get_endpoints
+_ENDPOINT_COLUMNS = (
+    Endpoint.id,
+    Endpoint.swagger_doc_id,
+    Endpoint.method,
+    Endpoint.path,
+    Endpoint.summary,
+    Endpoint.description,
+    Endpoint.operation_id,
+    Endpoint.tags,
+    Endpoint.deprecated,
+    Endpoint.parameters,
+    Endpoint.request_body,
+    Endpoint.responses,
+    Endpoint.security,
+    Endpoint.created_at,
+)
+_ENDPOINT_KEYS = tuple(column.key for column in _ENDPOINT_COLUMNS)
+
+# Bounds concurrent spec parsing so big uploads can't take over the
+# shared worker thread pool (created on first use, inside the event loop)
+_parser_limiter: Optional[CapacityLimiter] = None
+
+
+def _get_parser_limiter() -> CapacityLimiter:
+    """
+    Get the capacity limiter for spec parsing threads.
+
+    Returns:
+        CapacityLimiter sized by settings.PARSER_WORKERS
+    """
+    global _parser_limiter
+    if _parser_limiter is None:
+        _parser_limiter = CapacityLimiter(settings.PARSER_WORKERS)
+    return _parser_limiter
 
 
 class SwaggerDocService:
@@ -58,6 +106,40 @@ class SwaggerDocService:
             SwaggerDoc.user_id == user_id
         ).offset(skip).limit(limit).all()
     
+    @staticmethod
+    def get_page_by_user(
+        db: Session,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[SwaggerDoc], int]:
+        """
+        Get a page of Swagger docs for a user along with the total doc count.
+
+        The total is computed with a COUNT(*) OVER () window in the same
+        query, so paginated listings need a single round-trip.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+
+        Returns:
+            Tuple of (list of SwaggerDoc, total count of user's documents)
+        """
+        rows = db.query(
+            SwaggerDoc,
+            func.count().over().label('total')
+        ).filter(
+            SwaggerDoc.user_id == user_id
+        ).order_by(SwaggerDoc.id).offset(skip).limit(limit).all()
+
+        # An empty page (skip past the end) carries no window total
+        total = rows[0].total if rows else SwaggerDocService.count_by_user(db, user_id)
+
+        return [row.SwaggerDoc for row in rows], total
+    
     @staticmethod
     def count_by_user(db: Session, user_id: int) -> int:
         """
@@ -70,9 +152,9 @@ class SwaggerDocService:
         Returns:
             Count of documents
         """
-        return db.query(SwaggerDoc).filter(
-            SwaggerDoc.user_id == user_id
-        ).count()
+        return db.scalar(
+            select(func.count(SwaggerDoc.id)).where(SwaggerDoc.user_id == user_id)
+        ) or 0
     
     @staticmethod
     async def create_from_file(
@@ -97,18 +179,21 @@ class SwaggerDocService:
         Returns:
             Dictionary with result info
         """
-        # Read file content
+        # Read file content (kept as bytes, the parsers decode it themselves)
         content = await file.read()
-        content_str = content.decode('utf-8')
 
         # Determine file format
         file_format = "json"
         if file.filename.endswith(('.yaml', '.yml')):
             file_format = "yaml"
 
-        # Parse content
+        # Parse content (in a worker thread: large YAML specs take a while
+        # and would otherwise block the event loop)
         try:
-            spec = swagger_parser.parse_content(content_str, file_format)
+            spec = await to_thread.run_sync(
+                swagger_parser.parse_content, content, file_format,
+                limiter=_get_parser_limiter()
+            )
         except ValueError as e:
             return {
                 "success": False,
@@ -116,16 +201,13 @@ class SwaggerDocService:
                 "errors": [str(e)]
             }
 
-        # Create doc from parsed spec
-        return SwaggerDocService.create_from_spec(
-            db=db,
-            user_id=user_id,
-            name=name,
-            description=description,
-            spec=spec,
-            file_format=file_format,
-            base_url=base_url
+        # Validate and extract endpoints off the event loop as well,
+        # then store the doc from the parsed spec
+        analysis = await to_thread.run_sync(
+            SwaggerDocService._analyze_spec, spec, name, description, base_url,
+            limiter=_get_parser_limiter()
         )
+        return SwaggerDocService._store_spec(db, user_id, spec, file_format, analysis)
     
     @staticmethod
     def create_from_spec(
@@ -152,10 +234,36 @@ class SwaggerDocService:
         Returns:
             Dictionary with result info
         """
+        analysis = SwaggerDocService._analyze_spec(spec, name, description, base_url)
+        return SwaggerDocService._store_spec(db, user_id, spec, file_format, analysis)
+
+    @staticmethod
+    def _analyze_spec(
+        spec: Dict[str, Any],
+        name: str,
+        description: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Validate a specification and extract what is stored for it.
+
+        This is the CPU-heavy part of an import and doesn't touch the
+        database, so it can run in a worker thread.
+
+        Args:
+            spec: OpenAPI specification
+            name: Name for the document
+            description: Optional description
+            base_url: Optional base URL to override
+
+        Returns:
+            Dictionary with the doc fields, extracted endpoints and errors
+        """
         errors = []
+        content_hash = swagger_parser.compute_content_hash(spec)
 
-        # Validate spec
-        is_valid, validation_error = swagger_parser.validate_openapi_spec(spec)
+        # Validate spec (results are cached by content hash)
+        is_valid, validation_error = swagger_parser.validate_openapi_spec(spec, content_hash)
         if not is_valid:
             errors.append(f"Validation error: {validation_error}")
 
@@ -180,44 +288,87 @@ class SwaggerDocService:
         
         # Extract endpoints
         try:
-            endpoints_data = swagger_parser.extract_endpoints(spec)
+            endpoints_data = swagger_parser.extract_endpoints(spec, content_hash)
         except Exception as e:
             errors.append(f"Failed to extract endpoints: {str(e)}")
             endpoints_data = []
-        
+
+        return {
+            "name": name,
+            "description": description,
+            "version": api_info.get("version"),
+            "base_url": base_url,
+            "openapi_version": openapi_version,
+            "content_hash": content_hash,
+            "endpoints_data": endpoints_data,
+            "errors": errors
+        }
+
+    @staticmethod
+    def _store_spec(
+        db: Session,
+        user_id: int,
+        spec: Dict[str, Any],
+        file_format: str,
+        analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Store an analyzed specification and its endpoints.
+
+        Args:
+            db: Database session
+            user_id: Owner user ID
+            spec: OpenAPI specification
+            file_format: Format (json/yaml)
+            analysis: Result of _analyze_spec
+
+        Returns:
+            Dictionary with result info
+        """
+        endpoints_data = analysis["endpoints_data"]
+        errors = analysis["errors"]
+
         # Create SwaggerDoc
         swagger_doc = SwaggerDoc(
             user_id=user_id,
-            name=name,
-            description=description,
-            version=api_info.get("version"),
-            base_url=base_url,
+            name=analysis["name"],
+            description=analysis["description"],
+            version=analysis["version"],
+            base_url=analysis["base_url"],
             spec=spec,
+            content_hash=analysis["content_hash"],
             endpoints_count=len(endpoints_data),
             file_format=file_format,
-            openapi_version=openapi_version
+            openapi_version=analysis["openapi_version"]
         )
         
         db.add(swagger_doc)
         db.flush()  # Get the ID without committing
         
-        # Create Endpoint records
-        for endpoint_data in endpoints_data:
-            endpoint = Endpoint(
-                swagger_doc_id=swagger_doc.id,
-                method=endpoint_data["method"],
-                path=endpoint_data["path"],
-                summary=endpoint_data.get("summary"),
-                description=endpoint_data.get("description"),
-                operation_id=endpoint_data.get("operation_id"),
-                tags=endpoint_data.get("tags"),
-                parameters=endpoint_data.get("parameters"),
-                request_body=endpoint_data.get("request_body"),
-                responses=endpoint_data.get("responses"),
-                security=endpoint_data.get("security"),
-                deprecated=1 if endpoint_data.get("deprecated") else 0
-            )
-            db.add(endpoint)
+        # Create Endpoint records in a single batched INSERT
+        # (plain mappings skip ORM instance construction and unit-of-work bookkeeping)
+        db.bulk_insert_mappings(Endpoint, [
+            {
+                "swagger_doc_id": swagger_doc.id,
+                "method": endpoint_data["method"],
+                "path": endpoint_data["path"],
+                "summary": endpoint_data.get("summary"),
+                "description": endpoint_data.get("description"),
+                "operation_id": endpoint_data.get("operation_id"),
+                "function_name": build_function_name(
+                    endpoint_data["method"],
+                    endpoint_data["path"],
+                    endpoint_data.get("operation_id")
+                ),
+                "tags": endpoint_data.get("tags"),
+                "parameters": endpoint_data.get("parameters"),
+                "request_body": endpoint_data.get("request_body"),
+                "responses": endpoint_data.get("responses"),
+                "security": endpoint_data.get("security"),
+                "deprecated": 1 if endpoint_data.get("deprecated") else 0
+            }
+            for endpoint_data in endpoints_data
+        ])
         
         db.commit()
         db.refresh(swagger_doc)
@@ -274,27 +425,55 @@ class SwaggerDocService:
         db: Session,
         swagger_doc_id: int,
         user_id: int
-    ) -> Optional[List[Endpoint]]:
+    ) -> Optional[List[Dict[str, Any]]]:
         """
         Get all endpoints for a Swagger doc.
         
+        Endpoint rows are cached per doc. A cached doc costs one query
+        (ownership check and updated_at); an uncached one is loaded with
+        a single owner-filtered join.
+        
         Args:
             db: Database session
             swagger_doc_id: SwaggerDoc ID
             user_id: User ID (for authorization)
             
         Returns:
-            List of Endpoints or None if doc not found/unauthorized
+            List of endpoint dicts (shared, must not be modified) or None
+            if doc not found/unauthorized
         """
-        # Verify ownership
-        swagger_doc = SwaggerDocService.get_by_id(db, swagger_doc_id, user_id)
-        if not swagger_doc:
+        with _ENDPOINTS_CACHE_LOCK:
+            cached = _ENDPOINTS_CACHE.get(swagger_doc_id)
+        if cached is not None:
+            doc = db.execute(
+                select(SwaggerDoc.updated_at).where(
+                    SwaggerDoc.id == swagger_doc_id,
+                    SwaggerDoc.user_id == user_id
+                )
+            ).first()
+            if doc is None:
+                return None
+            if doc.updated_at == cached[0]:
+                return list(cached[1])
+        
+        # Outer join, so a doc without endpoints still yields a row
+        rows = db.execute(
+            select(SwaggerDoc.updated_at.label("doc_updated_at"), *_ENDPOINT_COLUMNS)
+            .select_from(SwaggerDoc)
+            .outerjoin(Endpoint, Endpoint.swagger_doc_id == SwaggerDoc.id)
+            .where(SwaggerDoc.id == swagger_doc_id, SwaggerDoc.user_id == user_id)
+            .order_by(Endpoint.id)
+        ).mappings().all()
+        if not rows:
             return None
         
-        return db.query(Endpoint).filter(
-            Endpoint.swagger_doc_id == swagger_doc_id
-        ).all()
-
+        endpoints = tuple(
+            {key: row[key] for key in _ENDPOINT_KEYS}
+            for row in rows if row["id"] is not None
+        )
+        with _ENDPOINTS_CACHE_LOCK:
+            _ENDPOINTS_CACHE[swagger_doc_id] = (rows[0]["doc_updated_at"], endpoints)
+        return list(endpoints)
 
 # Singleton instance
 swagger_doc_service = SwaggerDocService()
\ No newline at end of file
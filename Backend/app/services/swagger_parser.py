@@ -4,24 +4,385 @@ Swagger/OpenAPI Parser Service
 This service handles parsing, validation, and extraction of endpoints
 from Swagger/OpenAPI documentation files.
 """
-from typing import Dict, Any, List, Optional, Tuple
-import json
+from typing import Dict, Any, List, Optional, Tuple, Union
+from dataclasses import dataclass, field
+import hashlib
+import logging
+import threading
+import time
+from sys import intern
+import orjson
 import yaml
-from prance import ResolvingParser
-from openapi_spec_validator import validate_spec
+from cachetools import LRUCache
+import jsonref
+from openapi_spec_validator import (
+    validate_spec,
+    OpenAPIV2SpecValidator,
+    OpenAPIV30SpecValidator,
+    OpenAPIV31SpecValidator,
+)
 from openapi_spec_validator.validation.exceptions import OpenAPIValidationError
 
+logger = logging.getLogger(__name__)
+
+# At most one reference resolution warning is logged per interval, so a
+# malformed spec submitted in a loop doesn't flood the logs
+_REFS_WARNING_INTERVAL = 5.0
+_last_refs_warning = 0.0
+
+# libyaml's C parser when PyYAML was built with it, the pure-Python one otherwise
+try:
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
+
+# Spec validator classes by (major, minor) version; their JSON Schema
+# validators are compiled once, when openapi_spec_validator is imported
+_SPEC_VALIDATORS = {
+    "2.0": OpenAPIV2SpecValidator,
+    "3.0": OpenAPIV30SpecValidator,
+    "3.1": OpenAPIV31SpecValidator,
+}
+
+_HTTP_METHODS = frozenset(("get", "post", "put", "delete", "patch", "options", "head"))
+
+# Uppercase endpoint method of each operation key, interned so every
+# endpoint of a method shares one string
+_ENDPOINT_METHODS = {method: intern(method.upper()) for method in _HTTP_METHODS}
+
+# LRU caches of parse results, keyed by content digests. Entries are
+# never invalidated (same content, same result) and the cached objects
+# are shared, so callers must not modify them. Parsing runs in worker
+# threads, so every access goes through _PARSE_CACHE_LOCK.
+_PARSE_CACHE_SIZE = 32
+_PARSED_CACHE: LRUCache = LRUCache(maxsize=_PARSE_CACHE_SIZE)
+_VALIDATION_CACHE: LRUCache = LRUCache(maxsize=_PARSE_CACHE_SIZE)
+_ENDPOINTS_CACHE: LRUCache = LRUCache(maxsize=_PARSE_CACHE_SIZE)
+_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def _lru_get(cache: LRUCache, key: Any) -> Any:
+    """
+    Get an entry of an LRU cache, marking it as recently used.
+
+    Args:
+        cache: Cache
+        key: Entry key
+
+    Returns:
+        Cached value or None
+    """
+    with _PARSE_CACHE_LOCK:
+        return cache.get(key)
+
+
+def _lru_put(cache: LRUCache, key: Any, value: Any) -> None:
+    """
+    Store an entry in an LRU cache, evicting the least recently used one.
+
+    Args:
+        cache: Cache
+        key: Entry key
+        value: Value to store
+    """
+    with _PARSE_CACHE_LOCK:
+        cache[key] = value
+
+
+# Fields of an extracted endpoint, in the order of EndpointView.to_dict()
+_ENDPOINT_FIELDS = (
+    "method", "path", "summary", "description", "operation_id", "tags",
+    "parameters", "request_body", "responses", "security", "deprecated"
+)
+_ENDPOINT_FIELD_SET = frozenset(_ENDPOINT_FIELDS)
+
+
+class EndpointView:
+    """
+    Endpoint extracted from a specification, backed by its operation object.
+
+    Supports the read access of the endpoint dicts extracted before
+    (endpoint["path"], endpoint.get("summary"), to_dict()), but only
+    builds the parameters, request body and responses when first read.
+    """
+
+    __slots__ = ("path", "method", "_op", "_spec", "_cache")
+
+    def __init__(self, path: str, method: str, operation: Dict[str, Any], spec: Dict[str, Any]):
+        self.path = path
+        self.method = method
+        self._op = operation
+        self._spec = spec
+        self._cache: Dict[str, Any] = {}
+
+    @property
+    def summary(self) -> str:
+        return self._op.get("summary", "")
+
+    @property
+    def description(self) -> str:
+        return self._op.get("description", "")
+
+    @property
+    def operation_id(self) -> Optional[str]:
+        return self._op.get("operationId")
+
+    @property
+    def tags(self) -> List[str]:
+        return self._op.get("tags", [])
+
+    @property
+    def security(self) -> List[Dict[str, Any]]:
+        return self._op.get("security", [])
+
+    @property
+    def deprecated(self) -> bool:
+        return self._op.get("deprecated", False)
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        if "parameters" not in self._cache:
+            self._cache["parameters"] = SwaggerParserService._parse_parameters(
+                self._op.get("parameters", [])
+            )
+        return self._cache["parameters"]
+
+    @property
+    def request_body(self) -> Optional[Dict[str, Any]]:
+        if "request_body" not in self._cache:
+            self._cache["request_body"] = SwaggerParserService._parse_request_body(
+                self._op.get("requestBody")
+            )
+        return self._cache["request_body"]
+
+    @property
+    def responses(self) -> Dict[str, Any]:
+        if "responses" not in self._cache:
+            self._cache["responses"] = SwaggerParserService._parse_responses(
+                self._op.get("responses", {})
+            )
+        return self._cache["responses"]
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _ENDPOINT_FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in _ENDPOINT_FIELD_SET else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Build the full endpoint dictionary.
+
+        Returns:
+            Dictionary with every endpoint field
+        """
+        return {field: getattr(self, field) for field in _ENDPOINT_FIELDS}
+
+    def __repr__(self):
+        return f"<EndpointView {self.method} {self.path}>"
+
+
+@dataclass
+class EndpointTable:
+    """
+    Endpoints extracted from a specification, stored column by column.
+
+    Iterating (or indexing) yields EndpointView rows, so code written
+    against a list of endpoints keeps working. The views are built on
+    first access and reused, so what they parse lazily (parameters,
+    request body, responses) is parsed once per table.
+    """
+
+    spec: Dict[str, Any]
+    methods: List[str] = field(default_factory=list)
+    paths: List[str] = field(default_factory=list)
+    operations: List[Dict[str, Any]] = field(default_factory=list)
+    _views: List[EndpointView] = field(default_factory=list, init=False, repr=False, compare=False)
+
+    def append(self, path: str, method: str, operation: Dict[str, Any]) -> None:
+        """
+        Add an endpoint.
+
+        Args:
+            path: Endpoint path
+            method: HTTP method (uppercase)
+            operation: Operation object from spec
+        """
+        self.methods.append(method)
+        self.paths.append(path)
+        self.operations.append(operation)
+
+    def _rows(self) -> List[EndpointView]:
+        """
+        Get the endpoint views, building them if needed.
+
+        Tables are shared through the parse cache; concurrent builds are
+        harmless, the last one is kept.
+
+        Returns:
+            One EndpointView per endpoint
+        """
+        views = self._views
+        if len(views) != len(self.paths):
+            spec = self.spec
+            views = [
+                EndpointView(path, method, operation, spec)
+                for path, method, operation in zip(self.paths, self.methods, self.operations)
+            ]
+            self._views = views
+        return views
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, index: int) -> EndpointView:
+        return self._rows()[index]
+
+    def __iter__(self):
+        return iter(self._rows())
+
+
+def _sniff_format(content: Union[str, bytes]) -> str:
+    """
+    Detect whether content is JSON or YAML from its first significant character.
+
+    Args:
+        content: Content of the Swagger file
+
+    Returns:
+        "json" if the content starts with an object or array, "yaml" otherwise
+    """
+    # Only look at the start of the content, to avoid copying large files
+    head = content[:1024]
+    if isinstance(head, str):
+        head = head.lstrip("\ufeff \t\r\n")
+        return "json" if head[:1] in ("{", "[") else "yaml"
+    head = head.removeprefix(b"\xef\xbb\xbf").lstrip()
+    return "json" if head[:1] in (b"{", b"[") else "yaml"
+
+
+def _has_cycle(obj: Any) -> bool:
+    """
+    Check whether a JSON-like structure contains itself.
+
+    Resolved references share objects, so the structure is a graph:
+    depth-first search keeping track of the containers on the path.
+
+    Args:
+        obj: Dicts, lists and scalars
+
+    Returns:
+        True if a container is reachable from itself
+    """
+    on_path = set()
+    done = set()
+    stack = [(obj, False)] if isinstance(obj, (dict, list)) else []
+    while stack:
+        node, leaving = stack.pop()
+        node_id = id(node)
+        if leaving:
+            on_path.discard(node_id)
+            done.add(node_id)
+            continue
+        if node_id in on_path:
+            return True
+        if node_id in done:
+            continue
+        on_path.add(node_id)
+        stack.append((node, True))
+        for child in (node.values() if isinstance(node, dict) else node):
+            if isinstance(child, (dict, list)):
+                stack.append((child, False))
+    return False
+
+
+def _orjson_default(obj: Any) -> Any:
+    """
+    Convert extracted endpoints to types orjson serializes natively.
+
+    Args:
+        obj: Object orjson can't serialize
+
+    Returns:
+        Endpoint dict (EndpointView) or list of them (EndpointTable)
+
+    Raises:
+        TypeError: For any other type
+    """
+    if isinstance(obj, EndpointView):
+        return obj.to_dict()
+    if isinstance(obj, EndpointTable):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
 
 class SwaggerParserService:
     """Service for parsing and validating Swagger/OpenAPI documents."""
     
     @staticmethod
-    def parse_content(content: str, file_format: str = "json") -> Dict[str, Any]:
+    def parse_content(
+        content: Union[str, bytes, bytearray, memoryview, Dict[str, Any]],
+        file_format: str = "json"
+    ) -> Dict[str, Any]:
+        """
+        Parse Swagger content from string or raw bytes.
+        
+        The format is detected from the content itself, so JSON is never
+        handed to the (slower) YAML parser and mislabeled files still
+        parse. Results are cached by a digest of the content, so
+        re-uploads of the same file skip parsing.
+        
+        Args:
+            content: Content of the Swagger file (UTF-8 bytes or buffer,
+                parsed without decoding it to a string first), or an
+                already parsed specification, returned as is
+            file_format: Format hint ('json', 'yaml' or 'auto')
+            
+        Returns:
+            Parsed specification as dictionary (shared, must not be modified)
+            
+        Raises:
+            ValueError: If parsing fails
+        """
+        if isinstance(content, dict):
+            return content
+        
+        file_format = file_format.lower()
+        if file_format not in ("json", "yaml", "yml", "auto"):
+            raise ValueError(f"Unsupported file format: {file_format}")
+        
+        # Both parsers take UTF-8 bytes, so everything is parsed from bytes
+        if isinstance(content, str):
+            raw = content.encode()
+        elif isinstance(content, bytes):
+            raw = content
+        else:
+            raw = bytes(content)
+        key = (hashlib.blake2b(raw, digest_size=16).digest(), file_format)
+        spec = _lru_get(_PARSED_CACHE, key)
+        if spec is None:
+            detected = _sniff_format(raw)
+            try:
+                spec = SwaggerParserService._parse_content(raw, detected)
+            except ValueError:
+                # YAML flow mappings also start with "{"
+                if detected != "json" or file_format == "json":
+                    raise
+                spec = SwaggerParserService._parse_content(raw, "yaml")
+            if not isinstance(spec, dict):
+                raise ValueError("Specification must be a JSON/YAML object")
+            _lru_put(_PARSED_CACHE, key, spec)
+        return spec
+
+    @staticmethod
+    def _parse_content(content: Union[str, bytes], file_format: str) -> Dict[str, Any]:
         """
-        Parse Swagger content from string.
+        Parse Swagger content (uncached).
         
         Args:
-            content: String content of the Swagger file
+            content: Content of the Swagger file
             file_format: Format of the file ('json' or 'yaml')
             
         Returns:
@@ -32,34 +393,77 @@ class SwaggerParserService:
         """
         try:
             if file_format.lower() == "json":
-                return json.loads(content)
+                return orjson.loads(content)
             elif file_format.lower() in ["yaml", "yml"]:
-                return yaml.safe_load(content)
+                # Round-trip through JSON so the spec has the same shape as a
+                # JSON upload: integer keys (response codes) become strings
+                # and YAML dates become ISO strings
+                spec = yaml.load(content, Loader=_YAMLLoader)
+                return orjson.loads(orjson.dumps(spec, option=orjson.OPT_NON_STR_KEYS))
             else:
                 raise ValueError(f"Unsupported file format: {file_format}")
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON: {str(e)}")
         except yaml.YAMLError as e:
             raise ValueError(f"Invalid YAML: {str(e)}")
+        except orjson.JSONEncodeError as e:
+            raise ValueError(f"Unsupported YAML value: {str(e)}")
     
     @staticmethod
-    def validate_openapi_spec(spec: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+    def validate_openapi_spec(
+        spec: Dict[str, Any],
+        content_hash: Optional[str] = None
+    ) -> Tuple[bool, Optional[str]]:
         """
         Validate OpenAPI specification.
         
         Args:
             spec: OpenAPI specification dictionary
+            content_hash: Optional content hash of the spec, to reuse the
+                result of a previous validation of the same content
             
         Returns:
             Tuple of (is_valid, error_message)
         """
+        if content_hash is not None:
+            result = _lru_get(_VALIDATION_CACHE, content_hash)
+            if result is not None:
+                return result
+
+        version = SwaggerParserService.get_openapi_version(spec)
+        validator_cls = _SPEC_VALIDATORS.get(".".join(str(version).split(".")[:2])) if version else None
+
         try:
-            validate_spec(spec)
-            return True, None
+            if validator_cls is not None:
+                # Stop at the first error instead of collecting them all
+                error = next(validator_cls(spec).iter_errors(), None)
+                result = (True, None) if error is None else (False, str(error))
+            else:
+                # Unknown version: let validate_spec detect and report it
+                validate_spec(spec)
+                result = True, None
         except OpenAPIValidationError as e:
-            return False, str(e)
+            result = False, str(e)
         except Exception as e:
-            return False, f"Validation error: {str(e)}"
+            result = False, f"Validation error: {str(e)}"
+
+        if content_hash is not None:
+            _lru_put(_VALIDATION_CACHE, content_hash, result)
+        return result
+    
+    @staticmethod
+    def compute_content_hash(spec: Dict[str, Any]) -> str:
+        """
+        Compute a stable content hash of a specification.
+        
+        Args:
+            spec: OpenAPI specification dictionary
+            
+        Returns:
+            Hex digest (32 characters)
+        """
+        canonical = orjson.dumps(spec, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        return hashlib.blake2b(canonical, digest_size=16).hexdigest()
     
     @staticmethod
     def get_openapi_version(spec: Dict[str, Any]) -> Optional[str]:
@@ -122,17 +526,30 @@ class SwaggerParserService:
         }
     
     @staticmethod
-    def extract_endpoints(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def extract_endpoints(
+        spec: Dict[str, Any],
+        content_hash: Optional[str] = None
+    ) -> EndpointTable:
         """
         Extract all endpoints from the specification.
         
         Args:
             spec: OpenAPI specification dictionary
+            content_hash: Optional content hash of the spec, to reuse the
+                endpoints extracted from the same content before
             
         Returns:
-            List of endpoint dictionaries
+            Endpoint table (shared when cached, must not be modified)
         """
-        endpoints = []
+        if content_hash is not None:
+            endpoints = _lru_get(_ENDPOINTS_CACHE, content_hash)
+            if endpoints is None:
+                endpoints = SwaggerParserService.extract_endpoints(spec)
+                _lru_put(_ENDPOINTS_CACHE, content_hash, endpoints)
+            return endpoints
+
+        endpoints = EndpointTable(spec)
+        append = endpoints.append
         paths = spec.get("paths", {})
         
         for path, path_item in paths.items():
@@ -140,27 +557,41 @@ class SwaggerParserService:
             if not isinstance(path_item, dict):
                 continue
             
-            # Extract endpoints for each HTTP method
-            for method in ["get", "post", "put", "delete", "patch", "options", "head"]:
-                if method in path_item:
-                    operation = path_item[method]
-                    endpoint = SwaggerParserService._parse_operation(
-                        path=path,
-                        method=method.upper(),
-                        operation=operation,
-                        spec=spec
-                    )
-                    endpoints.append(endpoint)
+            # Extract endpoints for each HTTP method (path items also hold
+            # non-operation keys such as "parameters" or "summary")
+            for method, operation in path_item.items():
+                if method in _HTTP_METHODS and isinstance(operation, dict):
+                    append(path, _ENDPOINT_METHODS[method], operation)
         
         return endpoints
     
+    @staticmethod
+    def serialize_endpoints(endpoints: Any) -> bytes:
+        """
+        Serialize endpoints to JSON bytes with orjson.
+        
+        Args:
+            endpoints: Endpoint table, endpoint views or dicts, or any
+                JSON-compatible structure containing them
+            
+        Returns:
+            UTF-8 encoded JSON
+        """
+        # EndpointTable is a dataclass, which orjson would otherwise dump
+        # field by field (spec included) instead of handing it to the hook
+        return orjson.dumps(
+            endpoints,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+    
     @staticmethod
     def _parse_operation(
         path: str,
         method: str,
         operation: Dict[str, Any],
         spec: Dict[str, Any]
-    ) -> Dict[str, Any]:
+    ) -> "EndpointView":
         """
         Parse a single operation/endpoint.
         
@@ -171,21 +602,10 @@ class SwaggerParserService:
             spec: Full specification (for resolving references)
             
         Returns:
-            Parsed endpoint dictionary
+            Endpoint view (parameters, request body and responses are
+            parsed on first access)
         """
-        return {
-            "method": method,
-            "path": path,
-            "summary": operation.get("summary", ""),
-            "description": operation.get("description", ""),
-            "operation_id": operation.get("operationId"),
-            "tags": operation.get("tags", []),
-            "parameters": SwaggerParserService._parse_parameters(operation.get("parameters", [])),
-            "request_body": SwaggerParserService._parse_request_body(operation.get("requestBody")),
-            "responses": SwaggerParserService._parse_responses(operation.get("responses", {})),
-            "security": operation.get("security", []),
-            "deprecated": operation.get("deprecated", False)
-        }
+        return EndpointView(path, method, operation, spec)
     
     @staticmethod
     def _parse_parameters(parameters: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -198,31 +618,29 @@ class SwaggerParserService:
         Returns:
             Organized parameters dictionary
         """
-        organized = {
-            "query": [],
-            "path": [],
-            "header": [],
-            "cookie": []
-        }
+        buckets = {"query": [], "path": [], "header": [], "cookie": []}
         
         for param in parameters:
             if not isinstance(param, dict):
                 continue
             
-            param_in = param.get("in", "query")
+            bucket = buckets.get(param.get("in", "query"))
+            if bucket is None:
+                continue
+            
+            # Parameter names ("id", "limit", ...) repeat across endpoints
+            name = param.get("name")
             param_data = {
-                "name": param.get("name"),
+                "name": intern(name) if isinstance(name, str) else name,
                 "description": param.get("description", ""),
                 "required": param.get("required", False),
                 "schema": param.get("schema", {}),
                 "type": param.get("type"),  # Swagger 2.0
                 "format": param.get("format")  # Swagger 2.0
             }
-            
-            if param_in in organized:
-                organized[param_in].append(param_data)
+            bucket.append(param_data)
         
-        return organized
+        return buckets
     
     @staticmethod
     def _parse_request_body(request_body: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
@@ -278,30 +696,28 @@ class SwaggerParserService:
             spec: OpenAPI specification dictionary
             
         Returns:
-            Specification with resolved references
+            Specification with resolved references, or the original one
+            if they can't all be resolved
             
         Note:
-            This uses Prance to resolve all $ref pointers
+            References are resolved in memory with jsonref; resolved
+            objects are shared between the places that referenced them.
+            Recursive schemas would resolve to a cyclic structure, which
+            can't be serialized (orjson, JSON columns), so specs with
+            recursive references are returned unresolved.
         """
+        global _last_refs_warning
         try:
-            # Create a temporary file-like object for Prance
-            import tempfile
-            import os
-            
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                json.dump(spec, f)
-                temp_path = f.name
-            
-            try:
-                parser = ResolvingParser(temp_path)
-                resolved_spec = parser.specification
-                return resolved_spec
-            finally:
-                os.unlink(temp_path)
-                
+            resolved = jsonref.replace_refs(spec, proxies=False)
+            if _has_cycle(resolved):
+                raise ValueError("recursive references can't be inlined")
+            return resolved
         except Exception as e:
             # If resolution fails, return original spec
-            print(f"Warning: Could not resolve references: {str(e)}")
+            now = time.monotonic()
+            if now - _last_refs_warning >= _REFS_WARNING_INTERVAL:
+                _last_refs_warning = now
+                logger.warning("Could not resolve references: %s", e)
             return spec
 
 
@@ -1,27 +1,44 @@
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, load_only
+from app.db.session import commit_without_expire
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import get_password_hash, verify_password
 
+# Verified against when no user matches, so failed logins take the same
+# time whether or not the username exists
+_DUMMY_HASH = get_password_hash("!dummy-timing-pad!")
+
+# Columns needed for login and uniqueness checks; profile columns and
+# encrypted API keys are left unloaded
+_AUTH_COLS = (
+    User.id,
+    User.email,
+    User.username,
+    User.hashed_password,
+    User.is_active,
+    User.is_superuser,
+)
+
 
 class UserService:
     """Service for user-related operations."""
     
     @staticmethod
     def get_by_id(db: Session, user_id: int) -> Optional[User]:
-        """Get user by ID."""
-        return db.query(User).filter(User.id == user_id).first()
+        """Get user by ID, served from the session identity map when loaded."""
+        return db.get(User, user_id)
     
     @staticmethod
     def get_by_email(db: Session, email: str) -> Optional[User]:
-        """Get user by email."""
-        return db.query(User).filter(User.email == email).first()
+        """Get user by email. Only authentication columns are loaded."""
+        return db.query(User).options(load_only(*_AUTH_COLS)).filter(User.email == email).first()
     
     @staticmethod
     def get_by_username(db: Session, username: str) -> Optional[User]:
-        """Get user by username."""
-        return db.query(User).filter(User.username == username).first()
+        """Get user by username. Only authentication columns are loaded."""
+        return db.query(User).options(load_only(*_AUTH_COLS)).filter(User.username == username).first()
     
     @staticmethod
     def create(db: Session, user_in: UserCreate) -> User:
@@ -44,8 +61,9 @@ class UserService:
             is_superuser=False
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        # Column defaults are Python-side and the id comes back from the
+        # INSERT, so the instance is complete without a refresh
+        commit_without_expire(db)
         return db_user
     
     @staticmethod
@@ -89,12 +107,14 @@ class UserService:
         Returns:
             User instance if authentication succeeds, None otherwise
         """
-        # Try to find user by email first, then username
-        user = UserService.get_by_email(db, username_or_email)
-        if not user:
-            user = UserService.get_by_username(db, username_or_email)
+        # Match email or username in one query; an email match wins if
+        # the identifier is one user's email and another's username
+        user = db.query(User).options(load_only(*_AUTH_COLS)).filter(
+            or_(User.email == username_or_email, User.username == username_or_email)
+        ).order_by((User.email == username_or_email).desc()).first()
         
         if not user:
+            verify_password(password, _DUMMY_HASH)
             return None
         
         if not verify_password(password, user.hashed_password):
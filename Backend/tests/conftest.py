@@ -0,0 +1,31 @@
+import os
+
+# Settings required at import time by app.core.config
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("SUPERADMIN_PWD", "test-superadmin-password")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.session import Base
+import app.models  # noqa: F401  (registers the tables)
+
+
+@pytest.fixture
+def db():
+    """In-memory SQLite session with every table created."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import agent_service as agent_module
+from app.services.agent_service import AgentService
+
+
+def test_generation_cache_concurrent_access():
+    def store_and_get(i):
+        key = ("doc", i)
+        AgentService._store_generation(key, f"prompt {i}", [])
+        AgentService._get_generation(("doc", i - 1))
+        return True
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(store_and_get, range(2000)))
+
+    assert len(agent_module._GENERATION_CACHE) <= agent_module._GENERATION_CACHE.maxsize
+    assert AgentService._get_generation(("doc", 1999)) == ("prompt 1999", [])
+
+
+def test_filter_enabled_endpoints_uses_given_customizations():
+    from types import SimpleNamespace
+
+    endpoints = [
+        SimpleNamespace(operation_id="listPets"),
+        SimpleNamespace(operation_id="deletePet"),
+        SimpleNamespace(operation_id=None),
+    ]
+    customizations = {
+        "listPets": SimpleNamespace(is_enabled=True),
+        "deletePet": SimpleNamespace(is_enabled=False),
+    }
+
+    enabled = AgentService._filter_enabled_endpoints(endpoints, customizations)
+
+    assert [e.operation_id for e in enabled] == ["listPets", None]
+
+
+def test_generation_cache_returns_independent_functions():
+    functions = [{"name": "listPets", "parameters": {"type": "object", "properties": {}}}]
+    AgentService._store_generation(("doc", "copies"), "prompt", functions)
+
+    _, first = AgentService._get_generation(("doc", "copies"))
+    first[0]["parameters"]["properties"]["limit"] = {"type": "integer"}
+    functions[0]["name"] = "renamed"
+    _, second = AgentService._get_generation(("doc", "copies"))
+
+    assert second == [{"name": "listPets", "parameters": {"type": "object", "properties": {}}}]
+
+
+def test_page_by_user_counts_functions_in_the_database(db):
+    from app.models.agent import Agent
+    from app.models.swagger_doc import SwaggerDoc
+    from app.models.user import User
+
+    user = User(email="owner@example.com", username="owner", hashed_password="x")
+    db.add(user)
+    db.flush()
+    doc = SwaggerDoc(user_id=user.id, name="Pets", spec={"openapi": "3.0.3"})
+    db.add(doc)
+    db.flush()
+    for name, functions in (("Empty", []), ("Pets", [{"name": "listPets"}, {"name": "createPet"}])):
+        db.add(Agent(
+            user_id=user.id, swagger_doc_id=doc.id, name=name,
+            system_prompt="prompt", available_functions=functions
+        ))
+    db.commit()
+
+    agents, total = AgentService.get_page_by_user_simple(db, user.id)
+
+    assert total == 2
+    assert [(a.name, a.functions_count, a.swagger_doc_name) for a in agents] == [
+        ("Empty", 0, "Pets"), ("Pets", 2, "Pets")
+    ]
@@ -0,0 +1,92 @@
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.services.api_executor import APIExecutorService
+
+
+@pytest_asyncio.fixture
+async def client():
+    client = APIExecutorService.get_client()
+    yield client
+    await APIExecutorService.aclose()
+
+
+@pytest.mark.asyncio
+async def test_shared_client_does_not_keep_cookies(client):
+    request = httpx.Request("GET", "https://api.example.com/login")
+    response = httpx.Response(
+        200, headers={"set-cookie": "session=tenant-a; Path=/"}, request=request
+    )
+
+    client.cookies.extract_cookies(response)
+
+    assert len(client.cookies.jar) == 0
+
+
+def test_parameter_names_by_location():
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    from app.services.api_executor import _parameter_names
+
+    endpoint = SimpleNamespace(
+        id=42,
+        created_at=datetime(2024, 1, 1),
+        parameters={
+            "path": [{"name": "petId"}],
+            "query": [{"name": "limit"}, {"name": None}],
+            "header": [],
+            "cookie": [{"name": "session"}],
+        },
+    )
+
+    assert _parameter_names(endpoint) == (("petId",), ("limit",), ())
+
+
+async def _body(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_read_capped_rejects_unlabeled_oversized_body(monkeypatch):
+    from app.services import api_executor as executor_module
+
+    monkeypatch.setattr(executor_module, "_MAX_RESPONSE_SIZE", 10)
+    # Streamed body without Content-Length
+    response = httpx.Response(200, content=_body([b"123456", b"789012"]))
+
+    with pytest.raises(ValueError, match="too large"):
+        await executor_module._read_capped(response)
+
+
+@pytest.mark.asyncio
+async def test_read_capped_returns_body_within_limit(monkeypatch):
+    from app.services import api_executor as executor_module
+
+    monkeypatch.setattr(executor_module, "_MAX_RESPONSE_SIZE", 10)
+    response = httpx.Response(200, content=_body([b"12345", b"67890"]))
+
+    assert await executor_module._read_capped(response) == b"1234567890"
+
+
+def test_functions_index_cache_concurrent_access():
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    from app.services import api_executor
+
+    def index_and_invalidate(i):
+        agent = SimpleNamespace(
+            id=i % 600,
+            updated_at=datetime(2024, 1, 1),
+            available_functions=[{"name": f"fn_{i % 600}"}],
+        )
+        found = f"fn_{i % 600}" in api_executor._functions_index(agent)
+        api_executor.invalidate_functions_index(agent)
+        return found
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(index_and_invalidate, range(2000)))
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_active_user
+from app.api.endpoints import chat
+from app.db.session import get_db
+
+
+class _FakeSession:
+    closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+
+def _chunk(**delta):
+    return {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta}]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    agent = SimpleNamespace(
+        id=1, is_active=True, system_prompt="You are a pet store assistant.",
+        available_functions=[{"name": "listPets", "description": "List pets"}]
+    )
+    turns = [
+        [_chunk(function_call={"name": "listPets", "arguments": ""}),
+         _chunk(function_call={"arguments": '{"limit": '}),
+         _chunk(function_call={"arguments": "2}"})],
+        [_chunk(content="Two "), _chunk(content="pets.")],
+    ]
+    sent_messages = []
+    executor_sessions = []
+
+    async def fake_stream(user, agent, messages, functions=None):
+        sent_messages.append(list(messages))
+        for chunk in turns[len(sent_messages) - 1]:
+            yield chunk
+
+    async def fake_execute(db, agent, function_name, arguments):
+        executor_sessions.append((db, db.closed))
+        return {"success": True, "status_code": 200, "method": "GET",
+                "url": "https://pets.example.com/pets", "data": [{"name": "Rex"}]}
+
+    monkeypatch.setattr(chat.agent_service, "get_by_id", lambda db, agent_id, user_id: agent)
+    monkeypatch.setattr(chat.llm_service, "chat_completion_stream", fake_stream)
+    monkeypatch.setattr(chat.api_executor, "execute_function_call", fake_execute)
+    monkeypatch.setattr(chat, "SessionLocal", _FakeSession)
+
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id=1)
+    app.dependency_overrides[get_db] = lambda: None
+    test_client = TestClient(app)
+    test_client.sent_messages = sent_messages
+    test_client.executor_sessions = executor_sessions
+    return test_client
+
+
+def _events(response):
+    return [
+        orjson.loads(line[len("data: "):])
+        for line in response.text.split("\n")
+        if line.startswith("data: ")
+    ]
+
+
+def test_chat_stream_runs_function_calls_and_streams_reply(client):
+    response = client.post("/agents/1/chat/stream", json={"message": "How many pets?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response)
+    assert [e["type"] for e in events] == ["function_call", "content", "content", "done"]
+    assert events[0]["function_name"] == "listPets"
+    assert events[0]["arguments"] == {"limit": 2}
+    assert events[0]["api_call"]["status_code"] == 200
+    assert "".join(e["content"] for e in events if e["type"] == "content") == "Two pets."
+
+    # The function result is sent back to the LLM on the second turn
+    assert client.sent_messages[1][-1]["role"] == "function"
+    assert client.sent_messages[1][-2]["function_call"] == {"name": "listPets", "arguments": '{"limit": 2}'}
+
+
+def test_chat_stream_runs_function_calls_in_its_own_session(client):
+    client.post("/agents/1/chat/stream", json={"message": "How many pets?"})
+
+    [(session, closed_during_call)] = client.executor_sessions
+    assert isinstance(session, _FakeSession)
+    assert not closed_during_call
+    assert session.closed
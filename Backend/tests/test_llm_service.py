@@ -0,0 +1,196 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import llm_service as llm_module
+from app.services.llm_service import LLMService
+
+
+def _user(user_id, openai_api_key="encrypted-key"):
+    return SimpleNamespace(id=user_id, openai_api_key=openai_api_key, anthropic_api_key=None)
+
+
+def _agent():
+    return SimpleNamespace(
+        id=1, llm_provider="openai", llm_model="gpt-4o-mini", max_tokens=256, temperature_float=0.0,
+        updated_at=datetime(2024, 1, 1), available_functions=[{"name": "listPets"}]
+    )
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    calls = []
+
+    async def fake_completion(user, agent, messages, functions):
+        calls.append(user.id)
+        return {"choices": [{"message": {"role": "assistant", "content": f"answer for {user.id}"}}]}
+
+    llm_module._COMPLETION_CACHE.clear()
+    monkeypatch.setattr(LLMService, "_openai_chat_completion", staticmethod(fake_completion))
+    yield calls
+    llm_module._COMPLETION_CACHE.clear()
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.mark.asyncio
+async def test_completion_cache_is_per_user(fake_openai):
+    first = await LLMService.chat_completion(_user(1), _agent(), MESSAGES)
+    second = await LLMService.chat_completion(_user(2), _agent(), MESSAGES)
+
+    assert fake_openai == [1, 2]
+    assert first["choices"][0]["message"]["content"] == "answer for 1"
+    assert second["choices"][0]["message"]["content"] == "answer for 2"
+
+
+@pytest.mark.asyncio
+async def test_completion_cache_misses_after_key_change(fake_openai):
+    await LLMService.chat_completion(_user(1, "old-key"), _agent(), MESSAGES)
+    await LLMService.chat_completion(_user(1, "new-key"), _agent(), MESSAGES)
+
+    assert fake_openai == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_completion_cache_returns_copies(fake_openai):
+    first = await LLMService.chat_completion(_user(1), _agent(), MESSAGES)
+    first["choices"][0]["message"]["content"] = "modified"
+
+    second = await LLMService.chat_completion(_user(1), _agent(), MESSAGES)
+
+    assert fake_openai == [1]
+    assert second["choices"][0]["message"]["content"] == "answer for 1"
+
+
+
+@pytest.mark.asyncio
+async def test_completion_cache_misses_after_agent_update(fake_openai):
+    agent = _agent()
+    await LLMService.chat_completion(_user(1), agent, MESSAGES, agent.available_functions)
+    await LLMService.chat_completion(_user(1), agent, MESSAGES, agent.available_functions)
+
+    updated = _agent()
+    updated.updated_at = datetime(2024, 1, 2)
+    await LLMService.chat_completion(_user(1), updated, MESSAGES, updated.available_functions)
+
+    assert fake_openai == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_completion_cache_skips_functions_other_than_the_agents(fake_openai):
+    other_functions = [{"name": "deletePet"}]
+    await LLMService.chat_completion(_user(1), _agent(), MESSAGES, other_functions)
+    await LLMService.chat_completion(_user(1), _agent(), MESSAGES, other_functions)
+
+    assert fake_openai == [1, 1]
+
+@pytest.fixture
+def anthropic_agent(monkeypatch):
+    monkeypatch.setattr(LLMService, "get_api_key", staticmethod(lambda user, provider: "sk-test"))
+    return SimpleNamespace(
+        id=2, updated_at=None, llm_provider="anthropic", llm_model="claude-3-5-haiku-latest",
+        max_tokens=256, temperature_float=0.0, available_functions=None
+    )
+
+
+def test_anthropic_request_uses_last_system_message(anthropic_agent):
+    messages = [
+        {"role": "system", "content": "first"},
+        {"role": "user", "content": "hello"},
+        {"role": "system", "content": "second"},
+    ]
+
+    _, _, payload = LLMService._anthropic_request(_user(1), anthropic_agent, messages)
+
+    assert payload["system"] == "second"
+    assert payload["messages"] == [{"role": "user", "content": "hello"}]
+
+
+def test_anthropic_request_trims_extra_message_keys(anthropic_agent):
+    messages = [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": "", "function_call": {"name": "listPets"}},
+    ]
+
+    _, _, payload = LLMService._anthropic_request(_user(1), anthropic_agent, messages)
+
+    assert payload["messages"] == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": ""},
+    ]
+
+
+def test_anthropic_request_rejects_message_without_content(anthropic_agent):
+    messages = [{"role": "user", "name": "someone"}]
+
+    with pytest.raises(KeyError):
+        LLMService._anthropic_request(_user(1), anthropic_agent, messages)
+
+
+@pytest.fixture
+def provider_transport(monkeypatch):
+    import httpx
+
+    attempts = []
+    errors = {}
+
+    def handler(request):
+        attempts.append(request)
+        raise errors["error"]("simulated failure", request=request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(LLMService, "get_client", staticmethod(lambda provider: client))
+    monkeypatch.setattr(llm_module, "_retry_delay", lambda attempt, retry_after=None: 0)
+    return attempts, errors
+
+
+@pytest.mark.asyncio
+async def test_post_does_not_retry_read_timeouts(provider_transport):
+    import httpx
+
+    attempts, errors = provider_transport
+    errors["error"] = httpx.ReadTimeout
+
+    with pytest.raises(httpx.ReadTimeout):
+        await LLMService._post("openai", "https://api.openai.com/v1/chat/completions", content=b"{}")
+
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_post_retries_connect_errors(provider_transport):
+    import httpx
+
+    attempts, errors = provider_transport
+    errors["error"] = httpx.ConnectError
+
+    with pytest.raises(httpx.ConnectError):
+        await LLMService._post("openai", "https://api.openai.com/v1/chat/completions", content=b"{}")
+
+    assert len(attempts) == llm_module.settings.LLM_MAX_ATTEMPTS
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_closes_the_response_at_done(monkeypatch):
+    closed = []
+
+    async def fake_stream_lines(provider, url, **kwargs):
+        try:
+            yield 'data: {"choices": [{"index": 0, "delta": {"content": "Hi"}}]}'
+            yield "data: [DONE]"
+            yield 'data: {"never": "read"}'
+        finally:
+            closed.append(provider)
+
+    monkeypatch.setattr(
+        LLMService, "_openai_request",
+        staticmethod(lambda user, agent, messages, functions: ("https://api.openai.com", {}, {}))
+    )
+    monkeypatch.setattr(LLMService, "_stream_lines", staticmethod(fake_stream_lines))
+
+    chunks = [chunk async for chunk in LLMService.chat_completion_stream(_user(1), _agent(), MESSAGES)]
+
+    assert chunks == [{"choices": [{"index": 0, "delta": {"content": "Hi"}}]}]
+    assert closed == ["openai"]
@@ -0,0 +1,67 @@
+from app.models.endpoint import Endpoint
+from app.models.swagger_doc import SwaggerDoc
+from app.models.user import User
+from app.services.swagger_doc_service import swagger_doc_service
+
+
+def _create_doc(db, username="owner"):
+    user = User(email=f"{username}@example.com", username=username, hashed_password="x")
+    db.add(user)
+    db.flush()
+    doc = SwaggerDoc(user_id=user.id, name="Pets", spec={"openapi": "3.0.3"})
+    db.add(doc)
+    db.flush()
+    db.add(Endpoint(swagger_doc_id=doc.id, method="GET", path="/pets", deprecated=1))
+    db.commit()
+    return user, doc
+
+
+def test_get_endpoints_returns_plain_dicts(db):
+    user, doc = _create_doc(db)
+
+    endpoints = swagger_doc_service.get_endpoints(db, doc.id, user.id)
+
+    assert len(endpoints) == 1
+    assert isinstance(endpoints[0], dict)
+    assert endpoints[0]["path"] == "/pets"
+    assert endpoints[0]["deprecated"] == 1
+
+
+def test_get_endpoints_checks_owner(db):
+    _, doc = _create_doc(db)
+    other, _ = _create_doc(db, username="other")
+
+    assert swagger_doc_service.get_endpoints(db, doc.id, other.id) is None
+
+
+def test_get_endpoints_not_served_from_cache_after_delete(db):
+    user, doc = _create_doc(db)
+    doc_id, user_id = doc.id, user.id
+    assert swagger_doc_service.get_endpoints(db, doc_id, user_id)
+
+    swagger_doc_service.delete(db, doc)
+
+    assert swagger_doc_service.get_endpoints(db, doc_id, user_id) is None
+
+
+def test_get_endpoints_of_doc_without_endpoints(db):
+    user, _ = _create_doc(db)
+    empty = SwaggerDoc(user_id=user.id, name="Empty", spec={"openapi": "3.0.3"})
+    db.add(empty)
+    db.commit()
+
+    assert swagger_doc_service.get_endpoints(db, empty.id, user.id) == []
+
+
+def test_get_endpoints_reloads_after_doc_update(db):
+    from datetime import timedelta
+
+    user, doc = _create_doc(db)
+    assert len(swagger_doc_service.get_endpoints(db, doc.id, user.id)) == 1
+
+    db.add(Endpoint(swagger_doc_id=doc.id, method="POST", path="/pets"))
+    doc.updated_at = doc.updated_at + timedelta(seconds=1)
+    db.commit()
+
+    endpoints = swagger_doc_service.get_endpoints(db, doc.id, user.id)
+    assert [e["method"] for e in endpoints] == ["GET", "POST"]
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import orjson
+
+from app.schemas.endpoint import EndpointList
+from app.services.swagger_parser import swagger_parser
+
+
+def test_endpoint_list_response_coerces_orm_values():
+    # Endpoint.deprecated is an Integer column
+    row = {
+        "id": 1,
+        "swagger_doc_id": 7,
+        "method": "GET",
+        "path": "/pets",
+        "summary": None,
+        "description": None,
+        "operation_id": "listPets",
+        "tags": ["pets"],
+        "deprecated": 1,
+        "parameters": {"query": [], "path": [], "header": [], "cookie": []},
+        "request_body": None,
+        "responses": {},
+        "security": [],
+        "created_at": datetime(2024, 1, 2, 3, 4, 5),
+    }
+    endpoint_list = EndpointList(items=[row], total=1, swagger_doc_id=7)
+
+    data = orjson.loads(swagger_parser.serialize_endpoints(endpoint_list.model_dump()))
+
+    assert data["items"][0]["deprecated"] is True
+    assert data["items"][0]["created_at"] == "2024-01-02T03:04:05"
+    assert data["total"] == 1
+    assert data["swagger_doc_id"] == 7
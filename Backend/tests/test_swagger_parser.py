@@ -0,0 +1,223 @@
+import orjson
+import pytest
+
+from app.services.swagger_parser import swagger_parser
+
+
+SPEC = {
+    "openapi": "3.0.3",
+    "info": {"title": "Pets", "version": "1.0.0"},
+    "paths": {
+        "/pets": {
+            "get": {
+                "operationId": "listPets",
+                "tags": ["pets"],
+                "parameters": [{"name": "limit", "in": "query", "schema": {"type": "integer"}}],
+                "responses": {"200": {"description": "OK"}},
+            },
+            "post": {
+                "operationId": "createPet",
+                "responses": {"201": {"description": "Created"}},
+            },
+        }
+    },
+    "components": {"schemas": {"Pet": {"type": "object"}}},
+}
+
+
+def test_serialize_endpoints_outputs_endpoint_list():
+    endpoints = swagger_parser.extract_endpoints(SPEC)
+
+    data = orjson.loads(swagger_parser.serialize_endpoints(endpoints))
+
+    assert isinstance(data, list)
+    assert [(e["method"], e["path"]) for e in data] == [("GET", "/pets"), ("POST", "/pets")]
+    assert data[0]["operation_id"] == "listPets"
+    assert data[0]["parameters"]["query"][0]["name"] == "limit"
+    assert "components" not in orjson.dumps(data).decode()
+
+
+def test_serialize_endpoints_nested_in_payload():
+    endpoints = swagger_parser.extract_endpoints(SPEC)
+
+    data = orjson.loads(swagger_parser.serialize_endpoints({"items": endpoints, "total": len(endpoints)}))
+
+    assert data["total"] == 2
+    assert [e["operation_id"] for e in data["items"]] == ["listPets", "createPet"]
+
+
+def test_validate_accepts_valid_spec():
+    is_valid, error = swagger_parser.validate_openapi_spec(SPEC)
+
+    assert is_valid, error
+
+
+def test_validate_rejects_dangling_ref():
+    # Valid against the OpenAPI meta-schema, but the $ref points nowhere
+    spec = {
+        "openapi": "3.0.3",
+        "info": {"title": "Pets", "version": "1.0.0"},
+        "paths": {
+            "/pets": {
+                "get": {
+                    "responses": {
+                        "200": {
+                            "description": "OK",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Missing"}
+                                }
+                            },
+                        }
+                    }
+                }
+            }
+        },
+    }
+
+    is_valid, error = swagger_parser.validate_openapi_spec(spec)
+
+    assert not is_valid
+    assert error
+
+
+def test_validate_rejects_meta_schema_error():
+    spec = {"openapi": "3.0.3", "info": {"title": "Pets"}, "paths": {}}
+
+    is_valid, error = swagger_parser.validate_openapi_spec(spec)
+
+    assert not is_valid
+    assert error
+
+
+def test_extracted_methods_are_interned():
+    endpoints = swagger_parser.extract_endpoints(SPEC)
+
+    assert endpoints.methods == ["GET", "POST"]
+    assert endpoints.methods[0] is swagger_parser.extract_endpoints(SPEC).methods[0]
+
+
+def test_parse_cache_is_thread_safe():
+    from concurrent.futures import ThreadPoolExecutor
+
+    contents = [orjson.dumps({**SPEC, "info": {"title": f"API {i}", "version": "1"}}) for i in range(200)]
+
+    def parse(content):
+        return swagger_parser.parse_content(content, "json")["info"]["title"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        titles = list(pool.map(parse, contents * 3))
+
+    assert titles == [f"API {i}" for i in range(200)] * 3
+
+
+def test_refs_resolution_inlines_references():
+    spec = {
+        "paths": {"/pets": {"get": {"responses": {"200": {"$ref": "#/components/responses/Ok"}}}}},
+        "components": {"responses": {"Ok": {"description": "OK"}}},
+    }
+
+    resolved = swagger_parser.parse_with_refs_resolution(spec)
+
+    assert resolved["paths"]["/pets"]["get"]["responses"]["200"] == {"description": "OK"}
+    orjson.dumps(resolved)
+
+
+def test_refs_resolution_leaves_recursive_schemas_unresolved():
+    spec = {
+        "paths": {},
+        "components": {
+            "schemas": {
+                "Node": {
+                    "type": "object",
+                    "properties": {"children": {"type": "array", "items": {"$ref": "#/components/schemas/Node"}}},
+                }
+            }
+        },
+    }
+
+    resolved = swagger_parser.parse_with_refs_resolution(spec)
+
+    assert resolved is spec
+    orjson.dumps(resolved)
+
+
+def test_parse_parameters_keeps_parameter_shape():
+    parsed = swagger_parser._parse_parameters([
+        {"name": "limit", "in": "query", "schema": {"type": "integer"}},
+        {"name": "petId", "in": "path", "required": True, "type": "string", "format": "uuid"},
+        {"name": "weird", "in": "body"},
+        "not a parameter",
+    ])
+
+    assert set(parsed) == {"query", "path", "header", "cookie"}
+    assert parsed["query"] == [{
+        "name": "limit",
+        "description": "",
+        "required": False,
+        "schema": {"type": "integer"},
+        "type": None,
+        "format": None,
+    }]
+    assert parsed["path"][0]["type"] == "string"
+    assert parsed["path"][0]["format"] == "uuid"
+    assert parsed["header"] == [] and parsed["cookie"] == []
+
+
+@pytest.mark.parametrize("hint", ["json", "yaml", "auto"])
+def test_parse_content_detects_json_whatever_the_hint(hint):
+    content = b'\n  {"openapi": "3.0.0", "info": {"title": "Sniff JSON", "version": "1"}}'
+
+    spec = swagger_parser.parse_content(content, hint)
+
+    assert spec["info"]["title"] == "Sniff JSON"
+
+
+def test_parse_content_parses_yaml_labelled_as_json():
+    content = "openapi: 3.0.0\ninfo:\n  title: Sniff YAML\n  version: '1'\n"
+
+    spec = swagger_parser.parse_content(content, "json")
+
+    assert spec["info"]["title"] == "Sniff YAML"
+
+
+def test_parse_content_falls_back_to_yaml_for_flow_mappings():
+    content = "{openapi: 3.0.0, info: {title: Flow YAML, version: '1'}}"
+
+    assert swagger_parser.parse_content(content, "auto")["info"]["title"] == "Flow YAML"
+    with pytest.raises(ValueError):
+        swagger_parser.parse_content(content, "json")
+
+
+@pytest.mark.parametrize("wrap", [bytearray, memoryview])
+def test_parse_content_accepts_buffers(wrap):
+    content = b'{"openapi": "3.0.0", "info": {"title": "Buffer", "version": "1"}}'
+
+    spec = swagger_parser.parse_content(wrap(content), "json")
+
+    assert spec == orjson.loads(content)
+
+
+def test_parse_content_rejects_non_object_specs():
+    with pytest.raises(ValueError):
+        swagger_parser.parse_content(b"[1, 2, 3]", "auto")
+
+
+def test_endpoint_table_parses_parameters_once(monkeypatch):
+    from app.services.swagger_parser import SwaggerParserService
+
+    endpoints = swagger_parser.extract_endpoints(SPEC)
+    parse = SwaggerParserService._parse_parameters
+    calls = []
+
+    def counting_parse(parameters):
+        calls.append(parameters)
+        return parse(parameters)
+
+    monkeypatch.setattr(SwaggerParserService, "_parse_parameters", staticmethod(counting_parse))
+
+    swagger_parser.serialize_endpoints(endpoints)
+    [endpoint.parameters for endpoint in endpoints]
+
+    assert len(calls) == len(endpoints)
+    assert endpoints[0] is next(iter(endpoints))
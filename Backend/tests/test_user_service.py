@@ -0,0 +1,56 @@
+from app.schemas.user import UserCreate
+from app.services import user_service as user_module
+from app.services.user_service import UserService
+
+
+def _create(db, email, username, password="correct-horse"):
+    return UserService.create(
+        db, UserCreate(email=email, username=username, password=password)
+    )
+
+
+def test_create_does_not_refresh(db, monkeypatch):
+    def fail_refresh(*args, **kwargs):
+        raise AssertionError("create should not refresh the instance")
+
+    monkeypatch.setattr(db, "refresh", fail_refresh)
+
+    user = _create(db, "alice@example.com", "alice")
+
+    # Not expired by the commit: reading it issues no SELECT
+    assert {"id", "email", "created_at"} <= user.__dict__.keys()
+    assert user.id is not None
+    assert user.is_active is True
+    assert user.is_superuser is False
+
+
+def test_authenticate_by_email_or_username(db):
+    user = _create(db, "alice@example.com", "alice")
+
+    assert UserService.authenticate(db, "alice@example.com", "correct-horse").id == user.id
+    assert UserService.authenticate(db, "alice", "correct-horse").id == user.id
+    assert UserService.authenticate(db, "alice", "wrong-password") is None
+
+
+def test_authenticate_prefers_email_match(db):
+    # One user's username is another user's email
+    by_username = _create(db, "first@example.com", "bob@example.com", password="username-pass")
+    by_email = _create(db, "bob@example.com", "bob", password="email-pass")
+
+    assert UserService.authenticate(db, "bob@example.com", "email-pass").id == by_email.id
+    assert UserService.authenticate(db, "bob@example.com", "username-pass") is None
+    assert by_username.id != by_email.id
+
+
+def test_authenticate_unknown_user_still_verifies_password(db, monkeypatch):
+    calls = []
+
+    def fake_verify(password, hashed):
+        calls.append(hashed)
+        return False
+
+    monkeypatch.setattr(user_module, "verify_password", fake_verify)
+
+    assert UserService.authenticate(db, "nobody", "whatever") is None
+    assert calls == [user_module._DUMMY_HASH]
+